@@ -0,0 +1,63 @@
+"""四半期セグメントデータの集計処理（Streamlit非依存、SegmentCube のビューを入力とする）"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_loader import QUARTER_PATTERN
+
+_QUARTER_RE = re.compile(QUARTER_PATTERN)
+
+
+def sort_quarter_key(q):
+    """四半期データのソート用キー（FY2023-3Q → (2023, 3)、FY2023 → (2023, 0)、不正なラベルは ValueError）"""
+    match = _QUARTER_RE.match(q) if isinstance(q, str) else None
+    if match is None:
+        raise ValueError(f"決算年度のラベルが不正です: {q!r}（FY2023-3Q / FY2023 の形式）")
+    year, quarter = match.groups()
+    return (int(year), int(quarter or 0))
+
+
+def sort_by_last_quarter(table):
+    """最終四半期の降順に並べ替え"""
+    return table.sort_values(table.columns[-1], ascending=False)
+
+
+def growth_segments(segment_list):
+    """成長率分析の対象セグメント（「その他」を除外）"""
+    return [s for s in segment_list if s != 'その他']
+
+
+def segment_detail(view, segment, growth):
+    """選択セグメントの時系列データ（成長率・前期比・前年同期比付き）
+
+    growth は同じ view から計算した metrics.GrowthMetrics（通常は view.growth）。
+    """
+    if segment not in view.segment_index:
+        return pd.DataFrame()
+    seg_detail = view.segment_frame(segment)
+    if seg_detail.empty:
+        return seg_detail
+
+    # データがある四半期の位置で、全セグメント一括計算した指標を取り出す（行・列とも view と同じ並び）
+    row = view.segment_index[segment]
+    mask = view.present[row]
+    index = growth.index.to_numpy()[row, mask]
+    seg_detail['営業収益成長率'] = np.where(np.isnan(index), 0, index)
+    seg_detail['営業収益対前期成長率'] = growth.qoq.to_numpy()[row, mask]
+    seg_detail['営業収益前年同期比'] = growth.yoy.to_numpy()[row, mask]
+    return seg_detail
+
+
+DETAIL_COLUMNS = ['決算年度', '営業収益', '営業利益', '営業収益成長率', '営業収益対前期成長率', '営業収益前年同期比', '営業利益率']
+
+
+def detail_table(seg_detail):
+    """セグメント詳細の業績推移テーブル"""
+    return seg_detail[DETAIL_COLUMNS].copy().set_index('決算年度')
+
+
+def composition_table(seg_detail):
+    """セグメント詳細の構成比テーブル（横持ち）"""
+    comp_df = seg_detail[['決算年度', '営業収益構成比', '営業利益構成比']].copy()
+    return comp_df.set_index('決算年度').T
@@ -1,142 +1,441 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-import seaborn as sns
+import json
 import os
-import io
-import base64
-
-# --- 1. 日本語フォント設定 (ローカル & Cloud 両対応) ---
-def setup_font():
-    """fontsフォルダからフォントを読み込み、日本語表示を有効化"""
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    font_path = os.path.join(current_dir, "fonts", "ipaexg.ttf")
-    if os.path.exists(font_path):
-        fm.fontManager.addfont(font_path)
-        prop = fm.FontProperties(fname=font_path)
-        plt.rcParams['font.family'] = prop.get_name()
-        return prop.get_name()
-    else:
-        # フォールバック: システムフォントを試行
-        plt.rcParams['font.family'] = ['Meiryo', 'MS Gothic', 'Hiragino Sans', 'sans-serif']
-        return 'sans-serif'
-
-font_name = setup_font()
-plt.rcParams['axes.unicode_minus'] = False  # マイナス記号の文字化け対策
-sns.set_theme(style="whitegrid", rc={"font.family": font_name})
-
-st.set_page_config(page_title="イオン 四半期別セグメント業績分析", layout="wide")
-
-# --- 2. ユーティリティ関数 ---
-def get_html_report(df, title, fig=None):
-    """HTMLダウンロード用データの生成（テーブル＋チャート）"""
-    # チャートをbase64エンコード
-    chart_html = ""
-    if fig is not None:
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor='white')
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        buf.close()
-        chart_html = f'<div style="text-align:center; margin: 20px 0;"><img src="data:image/png;base64,{img_base64}" style="max-width:100%;"/></div>'
-    
-    return f"""
-    <html><head><meta charset='utf-8'>
-    <style>
-        body {{ font-family: 'Hiragino Sans', 'Meiryo', sans-serif; padding: 20px; background: #f5f5f5; }}
-        .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        table {{ border-collapse: collapse; width: 100%; margin-top: 20px; background: white; }}
-        th, td {{ border: 1px solid #ddd; padding: 10px; text-align: right; }}
-        th {{ background: linear-gradient(135deg, #1f77b4, #ff7f0e); color: white; text-align: center; }}
-        tr:nth-child(even) {{ background-color: #f9f9f9; }}
-        tr:hover {{ background-color: #f0f0f0; }}
-        h2 {{ color: #2C3E50; border-left: 5px solid #1f77b4; padding-left: 15px; margin-top: 0; }}
-        .timestamp {{ color: #888; font-size: 12px; text-align: right; margin-top: 20px; }}
-    </style></head>
-    <body>
-    <div class="container">
-        <h2>📊 {title}</h2>
-        {chart_html}
-        <h3>📋 詳細データ</h3>
-        {df.to_html(classes='data-table')}
-        <p class="timestamp">生成日時: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-    </div>
-    </body></html>
+
+import analysis
+import diagnostics
+import reports
+import vega_charts
+from datasets import DatasetRegistry
+from figure_cache import FigureCache
+from render_pool import RenderPool, default_workers
+from shared_cache import SharedCache
+
+# --- 1. ページ設定 ---
+# 日本語フォント・matplotlib の設定は画像を初めて描画するときにプロセスごとに1回だけ行う（charts.setup_matplotlib）
+# ページタイトルは選択中のデータセットで決めるため、st.set_page_config はデータセットの決定後（メイン処理の先頭）で呼ぶ
+
+# --- 2. データセットとキャッシュ ---
+# セグメントCSVのフォルダ（環境変数 SEGMENT_DATA_DIR で変更可、ベンチマークの合成データ等）
+DATA_DIR = os.environ.get("SEGMENT_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_DATASET = "segment_data"
+# データセット名（CSVファイル名）-> 表示名（未指定はファイル名のまま）
+DATASET_LABELS = {"segment_data": "イオン"}
+# 読み込み済みデータセットのメモリ上限（全セッション共有、環境変数 DATASET_CACHE_MAX_MB で変更可）
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("DATASET_CACHE_MAX_MB", "256")) * 1024 * 1024
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 描画済みチャートのキャッシュ上限（全セッション共有）
+REPORT_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 生成済みHTMLレポートのキャッシュ上限（全セッション共有）
+# プロセス間で共有するディスクキャッシュ（環境変数 SHARED_CACHE_DIR を指定したときのみ、同じホストのレプリカ・再起動後で共有）
+SHARED_CACHE_DIR = os.environ.get("SHARED_CACHE_DIR")
+SHARED_CACHE_MAX_BYTES = int(os.environ.get("SHARED_CACHE_MAX_MB", "512")) * 1024 * 1024
+# 画像表示で1回の再実行のチャートを並列に描画するプロセス数（環境変数 CHART_WORKERS、1以下なら並列化しない）
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS") or default_workers())
+# 表の書式（st.dataframe の column_config、金額は桁区切りの整数）と、列をページに分ける四半期数
+TABLE_AMOUNT_FORMAT = "localized"
+TABLE_PAGE_QUARTERS = 40
+# チャートの描画方式（ブラウザ描画の Vega-Lite / サーバー描画の matplotlib PNG）
+CHART_BACKEND_VEGA = "インタラクティブ（ブラウザで描画）"
+CHART_BACKEND_IMAGE = "画像（サーバーで描画）"
+CHART_BACKENDS = {"vega": CHART_BACKEND_VEGA, "image": CHART_BACKEND_IMAGE}
+# 既定の描画方式（環境変数 CHART_BACKEND=vega|image で変更可）
+DEFAULT_CHART_BACKEND = CHART_BACKENDS.get(os.environ.get("CHART_BACKEND", "vega"), CHART_BACKEND_VEGA)
+
+@st.cache_resource(show_spinner=False)
+def get_dataset_registry(data_dir):
+    """data/ 配下のCSVのレジストリ（フォルダごとにプロセス内で1つ、キューブは初回アクセス時に構築）"""
+    return DatasetRegistry(data_dir, max_bytes=DATASET_CACHE_MAX_BYTES)
+
+@st.cache_resource
+def get_figure_cache():
+    """描画済みチャートのLRUキャッシュ（プロセス内で1つ）"""
+    return FigureCache(max_bytes=FIGURE_CACHE_MAX_BYTES)
+
+@st.cache_resource
+def get_report_cache():
+    """生成済みHTMLレポートのLRUキャッシュ（プロセス内で1つ、合計サイズで上限を設ける）"""
+    return FigureCache(max_bytes=REPORT_CACHE_MAX_BYTES, name="report_cache")
+
+@st.cache_resource
+def get_render_pool():
+    """チャートの並列描画用プロセスプール（プロセス内で1つ、CHART_WORKERS が1以下なら None）"""
+    if CHART_WORKERS <= 1:
+        return None
+    pool = RenderPool(CHART_WORKERS)
+    return pool if pool.warm_up() else None
+
+@st.cache_resource
+def get_shared_cache():
+    """プロセス間で共有するディスクキャッシュ（SHARED_CACHE_DIR 未設定なら None）"""
+    if not SHARED_CACHE_DIR:
+        return None
+    return SharedCache(SHARED_CACHE_DIR, max_bytes=SHARED_CACHE_MAX_BYTES)
+
+def shared_result(key, compute):
+    """ディスクキャッシュにあれば返し、なければ compute() の結果を保存して返す（キャッシュ未設定なら compute() のみ）"""
+    cache = get_shared_cache()
+    return compute() if cache is None else cache.get_or_render(key, compute)
+
+def dataset_label(name):
+    return DATASET_LABELS.get(name, name)
+
+# --- 3. ユーティリティ関数 ---
+def chart_key(view, chart_id, segment):
+    """描画済みチャートのキャッシュキー"""
+    return (chart_id, view.quarters[0], view.quarters[-1], segment, view.version)
+
+def show_chart(view, chart_id, segment=None):
+    """チャートを表示（ブラウザ描画なら Vega-Lite 仕様を送り、画像なら描画済みPNGをキャッシュから返す）"""
+    if chart_id not in reports.SEGMENT_REPORTS:
+        segment = None
+    key = chart_key(view, chart_id, segment)
+    if st.session_state.get("chart_backend", DEFAULT_CHART_BACKEND) == CHART_BACKEND_VEGA:
+        with diagnostics.span("vega.spec"):
+            if get_shared_cache() is None:
+                spec = vega_charts.build_spec(view, chart_id, segment)
+            else:
+                # ディスクキャッシュには JSON 文字列で保存する
+                text = shared_result(("vega", *key), lambda: vega_spec_json(view, chart_id, segment))
+                spec = json.loads(text) if text else None
+        if spec is not None:
+            if diagnostics.ENABLED:
+                diagnostics.add_bytes("vega.spec", len(json.dumps(spec, ensure_ascii=False).encode("utf-8")))
+            with diagnostics.span("st.vega_lite_chart"):
+                # 2x2グリッド（concat）は各パネルの幅指定に従う
+                st.vega_lite_chart(spec, width="content" if "vconcat" in spec else "stretch")
+        return
+    # プロセス内のLRUキャッシュ → ディスクキャッシュ → 描画 の順に探す
+    png = get_figure_cache().get_or_render(
+        key, lambda: shared_result(("figure", *key), lambda: reports.build_chart_png(view, chart_id, segment))
+    )
+    with diagnostics.span("st.image"):
+        st.image(png, width="stretch")
+
+def quarter_pages(n_quarters, size):
+    """四半期列のページ分け [(開始, 終了)]（最新の四半期までのページが全幅になるよう末尾から区切る）"""
+    return [(max(0, end - size), end) for end in reversed(range(n_quarters, 0, -size))]
+
+def show_table(table, number_format, key, progress=False):
+    """表を st.dataframe で表示（書式は column_config でブラウザ側に任せ、HTMLは生成しない）
+
+    number_format は printf 形式の書式（全列共通）または 列名 -> 書式 の dict。
+    金額の桁区切り（TABLE_AMOUNT_FORMAT）の列は整数に丸めてから渡す。
+    progress=True なら 0〜表の最大値のプログレスバー列で表示する。
+    四半期が列の表で TABLE_PAGE_QUARTERS を超える場合は、四半期の範囲を選んで表示する。
     """
+    formats = number_format if isinstance(number_format, dict) else dict.fromkeys(table.columns, number_format)
+    amount_columns = [col for col, fmt in formats.items() if fmt == TABLE_AMOUNT_FORMAT]
+    if amount_columns:
+        table = table.round(dict.fromkeys(amount_columns, 0))
+    # プログレスバーの最大値はページによらず表全体から求める
+    max_value = float(table.max(axis=None)) if progress else None
+    if table.columns.name == "決算年度" and len(table.columns) > TABLE_PAGE_QUARTERS:
+        pages = quarter_pages(len(table.columns), TABLE_PAGE_QUARTERS)
+        quarters = table.columns
+        page = st.select_slider(
+            "表示する四半期", options=range(len(pages)), value=len(pages) - 1,
+            format_func=lambda i: f"{quarters[pages[i][0]]}〜{quarters[pages[i][1] - 1]}",
+            key=f"{key}_page_{quarters[0]}_{quarters[-1]}",
+        )
+        table = table.iloc[:, slice(*pages[page])]
+    if progress:
+        config = {col: st.column_config.ProgressColumn(format=formats[col], min_value=0, max_value=max_value)
+                  for col in table.columns}
+    else:
+        config = {col: st.column_config.NumberColumn(format=formats[col]) for col in table.columns if col in formats}
+    st.dataframe(table, column_config=config, width="stretch")
+
+def vega_spec_json(view, chart_id, segment):
+    """Vega-Lite 仕様の JSON 文字列（表示するデータがなければ空文字列）"""
+    spec = vega_charts.build_spec(view, chart_id, segment)
+    return "" if spec is None else json.dumps(spec, ensure_ascii=False)
 
-def sort_quarter_key(q):
-    """四半期データのソート用キー（FY2023-3Q → (2023, 3)）"""
-    try:
-        if '-' in q:
-            parts = q.replace('FY', '').split('-')
-            year = int(parts[0])
-            quarter = int(parts[1].replace('Q', ''))
-            return (year, quarter)
+def render_html_report(view, report_id, start_q, end_q, segment=None, fmt="png", compress=False):
+    """HTMLレポートをダウンロード時にのみ生成（データセット・レポート種別・期間・セグメント・形式単位でキャッシュ）
+
+    1件が数MBになるため、件数ではなく合計サイズで上限を設けたキャッシュ（get_report_cache）に保持する。
+    """
+    def build():
+        if report_id is None:
+            html = reports.build_combined_report(view, [segment] if segment else [], fmt)
         else:
-            return (int(q.replace('FY', '')), 0)
-    except:
-        return (0, 0)
-
-# --- 3. データの読み込み ---
-def convert_to_numeric(series):
-    """カンマ区切り文字列を数値に変換"""
-    if series.dtype == 'object':
-        return pd.to_numeric(
-            series.astype(str).str.replace(',', '').str.strip(),
-            errors='coerce'
-        ).fillna(0)
-    return series
-
-@st.cache_data
-def load_segment_data():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    path = os.path.join(current_dir, "data", "segment_data.csv")
-    if os.path.exists(path):
-        # エンコーディングを自動判定して読み込み（Windows対応）
-        encodings = ['utf-8', 'cp932', 'shift_jis', 'utf-8-sig']
-        df = None
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(path, encoding=encoding)
-                break
-            except (UnicodeDecodeError, UnicodeError):
+            html = reports.build_report(view, report_id, segment, fmt)
+        return reports.compress_report(html) if compress else html
+
+    key = ("report", report_id, start_q, end_q, segment, fmt, compress, view.version)
+    return get_report_cache().get_or_render(key, lambda: shared_result(key, build))
+
+def download_report(view, report_id, start_q, end_q, segment, fmt, compress):
+    """ダウンロード要求時に呼ばれる（診断が有効ならレポート生成を1つの実行として記録）"""
+    with diagnostics.run("report", report_id=report_id or "combined", fmt=fmt, compress=compress):
+        return render_html_report(view, report_id, start_q, end_q, segment, fmt, compress)
+
+def report_download_button(view, report_id, segment=None, label="📥 HTMLでダウンロード（チャート＋テーブル）",
+                           container=st):
+    """HTMLレポートのダウンロードボタン（クリックされるまで描画・エンコードは行わない、report_id=None は総合レポート）"""
+    if report_id is not None and report_id not in reports.SEGMENT_REPORTS:
+        segment = None
+    start_q, end_q = view.quarters[0], view.quarters[-1]
+    fmt = st.session_state.get("report_format", "png")
+    compress = st.session_state.get("report_gzip", False)
+    container.download_button(
+        label,
+        lambda: download_report(view, report_id, start_q, end_q, segment, fmt, compress),
+        reports.report_file_name(report_id, segment, compress),
+        reports.report_mime(compress),
+        key=f"{report_id or 'combined'}_html",
+        on_click="ignore",
+    )
+
+# --- 4. 分析ビュー（選択されたものだけを計算・描画する） ---
+# ==========================================================
+# ビュー1: 全体概要
+# ==========================================================
+def render_overview(view, segment_list, selected_segment):
+    """全体概要：営業収益・営業利益の積み上げ棒グラフと一覧表"""
+    st.subheader("セグメント別収益・利益の推移（四半期）")
+
+    # 営業収益の積み上げ棒グラフ
+    show_chart(view, 'revenue')
+
+    # 営業利益の積み上げ棒グラフ
+    show_chart(view, 'profit')
+
+    # 営業収益テーブル
+    st.markdown("#### 営業収益一覧（百万円）")
+    revenue_table = view.table('営業収益', segment_list)
+    show_table(revenue_table, TABLE_AMOUNT_FORMAT, "revenue_table")
+    report_download_button(view, 'revenue')
+
+    # 営業利益テーブル
+    st.markdown("#### 営業利益一覧（百万円）")
+    profit_table = view.table('営業利益', segment_list)
+    show_table(profit_table, TABLE_AMOUNT_FORMAT, "profit_table")
+    report_download_button(view, 'profit')
+
+# ==========================================================
+# ビュー2: 構成比推移
+# ==========================================================
+def render_composition(view, segment_list, selected_segment):
+    """構成比推移：営業収益・営業利益構成比の折れ線と一覧表"""
+    st.subheader("セグメント別構成比の推移（四半期）")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # 営業収益構成比
+        show_chart(view, 'comp_rev')
+
+    with col2:
+        # 営業利益構成比
+        show_chart(view, 'comp_profit')
+
+    # 構成比テーブル（クロス集計）
+    st.markdown("#### 営業収益構成比一覧（%）")
+    crosstab_rev = analysis.sort_by_last_quarter(view.table('営業収益構成比', segment_list))
+    show_table(crosstab_rev, "%.1f", "comp_rev_table")
+    report_download_button(view, 'comp_rev')
+
+    st.markdown("#### 営業利益構成比一覧（%）")
+    crosstab_profit = analysis.sort_by_last_quarter(view.table('営業利益構成比', segment_list))
+    show_table(crosstab_profit, "%.1f", "comp_profit_table")
+    report_download_button(view, 'comp_profit')
+
+# ==========================================================
+# ビュー3: 利益率推移
+# ==========================================================
+def render_margin(view, segment_list, selected_segment):
+    """利益率推移：営業利益率の折れ線と一覧表"""
+    st.subheader("セグメント別営業利益率の推移（四半期）")
+
+    show_chart(view, 'margin')
+
+    # 営業利益率テーブル
+    st.markdown("#### 営業利益率一覧（%）")
+    crosstab_margin = analysis.sort_by_last_quarter(view.table('営業利益率', segment_list))
+    show_table(crosstab_margin, "%.1f", "margin_table")
+    report_download_button(view, 'margin')
+
+# ==========================================================
+# ビュー4: 成長率分析
+# ==========================================================
+def render_growth(view, segment_list, selected_segment):
+    """成長率分析：期首四半期基準の営業収益成長率"""
+    start_q = view.quarters[0]
+    st.subheader(f"セグメント別営業収益成長率（{start_q}基準）")
+
+    # 成長率計算（start_q基準、「その他」を除外、全セグメントを一括計算）
+    growth_metrics = view.growth
+    growth_segments = analysis.growth_segments(segment_list)
+    growth = growth_metrics.base_index(growth_segments)
+
+    if not growth.empty:
+        show_chart(view, 'growth')
+
+        # 成長率テーブル
+        st.markdown(f"#### 営業収益成長率一覧（{start_q}=1.00）")
+        crosstab_growth = analysis.sort_by_last_quarter(growth)
+        show_table(crosstab_growth, "%.2f", "growth_table")
+        report_download_button(view, 'growth')
+
+        # 成長サマリー（CAGR・前年同期比・前四半期比）
+        st.markdown(f"#### 成長サマリー（{start_q}〜{view.quarters[-1]}）")
+        summary = growth_metrics.summary(growth.index).sort_values('CAGR（年率%）', ascending=False)
+        show_table(summary, "%.1f", "growth_summary")
+    else:
+        st.warning("成長率を計算できるデータがありません。")
+
+# ==========================================================
+# ビュー5: セグメント詳細
+# ==========================================================
+def render_detail(view, segment_list, selected_segment):
+    """セグメント詳細：選択セグメントの4象限グラフと推移テーブル"""
+    st.subheader(f"🔍 {selected_segment} - 詳細分析（四半期）")
+
+    # セグメントデータ抽出（成長率・前期比・前年同期比付き）
+    seg_detail = analysis.segment_detail(view, selected_segment, view.growth)
+
+    if not seg_detail.empty:
+        # 2x2サブプロット
+        show_chart(view, 'detail', selected_segment)
+
+        # 詳細テーブル
+        st.markdown("#### 業績推移テーブル")
+        display_df = analysis.detail_table(seg_detail)
+
+        format_dict = {
+            '営業収益': TABLE_AMOUNT_FORMAT,
+            '営業利益': TABLE_AMOUNT_FORMAT,
+            '営業収益成長率': '%.2f',
+            '営業収益対前期成長率': '%.1f',
+            '営業収益前年同期比': '%.1f',
+            '営業利益率': '%.1f'
+        }
+        show_table(display_df, format_dict, "detail_table")
+
+        # 構成比テーブル（横持ち・プログレスバー列）
+        st.markdown("#### 構成比推移")
+        comp_df = analysis.composition_table(seg_detail)
+        show_table(comp_df, "%.1f%%", "composition_table", progress=True)
+
+        report_download_button(view, 'detail', selected_segment)
+
+    else:
+        st.warning("選択されたセグメントのデータが見つかりません。")
+
+# ラベル -> 描画関数（表示順）
+VIEWS = {
+    "📊 全体概要": render_overview,
+    "📈 構成比推移": render_composition,
+    "💹 利益率推移": render_margin,
+    "🚀 成長率分析": render_growth,
+    "🔍 セグメント詳細": render_detail,
+}
+
+# ラベル -> ビューで表示するチャート（画像表示での並列描画に使う）
+VIEW_CHARTS = {
+    "📊 全体概要": ['revenue', 'profit'],
+    "📈 構成比推移": ['comp_rev', 'comp_profit'],
+    "💹 利益率推移": ['margin'],
+    "🚀 成長率分析": ['growth'],
+    "🔍 セグメント詳細": ['detail'],
+}
+
+VIEW_MODE_SINGLE = "選択したビューのみ表示（高速）"
+VIEW_MODE_TABS = "タブ表示（全ビューを計算）"
+
+def render_view(label, view, segment_list, selected_segment):
+    with diagnostics.span(f"view:{label}"):
+        VIEWS[label](view, segment_list, selected_segment)
+
+def prerender_charts(view, labels, selected_segment):
+    """画像表示のとき、これから表示するビューの未描画のチャートをまとめて並列に描画し、キャッシュに入れる
+
+    各ビューの show_chart はキャッシュから表示順に取り出すだけになる。
+    """
+    if st.session_state.get("chart_backend", DEFAULT_CHART_BACKEND) != CHART_BACKEND_IMAGE:
+        return
+    pool = get_render_pool()
+    if pool is None:
+        return
+    cache, shared = get_figure_cache(), get_shared_cache()
+    pending = []
+    for label in labels:
+        for chart_id in VIEW_CHARTS[label]:
+            segment = selected_segment if chart_id in reports.SEGMENT_REPORTS else None
+            key = chart_key(view, chart_id, segment)
+            if key in cache:
                 continue
-        
-        if df is None:
-            return None
-        
-        # 四半期データのみを抽出（Q1, Q2, Q3, Q4）
-        df = df[df['決算種別'].isin(['Q1', 'Q2', 'Q3', 'Q4'])].reset_index(drop=True)
-        
-        # 数値カラムの変換（カンマ区切り・スペース対応）
-        numeric_cols = ['営業収益', '営業利益', '設備投資']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = convert_to_numeric(df[col])
-        
-        # 営業利益率を丸める
-        df['営業利益率'] = np.round(df['営業利益率'], 1)
-        
-        # ソート用の数値列を追加
-        df['ソートキー'] = df['決算年度'].apply(lambda x: sort_quarter_key(x))
-        df = df.sort_values(['セグメント', 'ソートキー']).reset_index(drop=True)
-        
-        return df
-    return None
-
-# --- 4. メイン UI ---
-st.title("📊 イオン 四半期別セグメント業績分析ダッシュボード")
-
-df_raw = load_segment_data()
-
-if df_raw is not None:
-    # --- サイドバー ---
-    st.sidebar.header("🔧 分析条件")
-    
+            png = shared.get(("figure", *key)) if shared is not None else None
+            if png is not None:
+                cache.put(key, png)
+            else:
+                pending.append((key, chart_id, segment))
+    # 1枚だけなら show_chart でその場で描画する
+    if len(pending) <= 1:
+        return
+    pngs = pool.render(view, [(chart_id, segment) for _, chart_id, segment in pending])
+    for (key, _, _), png in zip(pending, pngs):
+        if png is None:
+            continue
+        cache.put(key, png)
+        if shared is not None:
+            shared.put(("figure", *key), png)
+
+def show_diagnostics(record):
+    """サイドバーに今回の再実行の計測結果を表示（環境変数 DIAGNOSTICS が有効な場合のみ）"""
+    with st.sidebar.expander("🩺 診断情報（今回の再実行）"):
+        col1, col2 = st.columns(2)
+        col1.metric("合計", f"{record['total_ms']:.0f} ms")
+        if 'peak_rss_mb' in record:
+            col2.metric("ピークRSS", f"{record['peak_rss_mb']:.0f} MB", f"+{record['peak_rss_growth_mb']:.1f} MB",
+                        delta_color="inverse")
+        if 'traced_peak_mb' in record:
+            st.caption(f"再実行中のピーク割り当て（tracemalloc）: {record['traced_peak_mb']:.1f} MB")
+        spans = [{"区間": name, "回数": s["calls"], "ms": s["ms"]} for name, s in record["spans"].items()]
+        st.dataframe(sorted(spans, key=lambda s: -s["ms"]), hide_index=True, width="stretch")
+        st.caption("区間は入れ子になっているため合計は一致しません")
+        if record["counters"]:
+            st.markdown("**キャッシュ**")
+            st.json(record["counters"])
+        if record["bytes"]:
+            st.markdown("**出力サイズ（バイト）**")
+            st.json(record["bytes"])
+
+# --- 5. メイン UI ---
+diagnostics.begin("rerun")
+registry = get_dataset_registry(DATA_DIR)
+dataset_names = registry.names()
+
+# データセット（企業）：選択ボックスの値は表示前に session_state から読み、ページタイトルにも使う
+if DEFAULT_DATASET in dataset_names or not dataset_names:
+    default_dataset = DEFAULT_DATASET
+else:
+    default_dataset = dataset_names[0]
+dataset = st.session_state.get("dataset", default_dataset)
+if dataset not in dataset_names:
+    dataset = default_dataset
+st.set_page_config(page_title=f"{dataset_label(dataset)} 四半期別セグメント業績分析", layout="wide")
+
+# --- サイドバー ---
+st.sidebar.header("🔧 分析条件")
+
+# データセット（企業）選択：複数のCSVがある場合のみ表示
+if len(dataset_names) > 1:
+    dataset = st.sidebar.selectbox("🏢 データセット", dataset_names, index=dataset_names.index(dataset),
+                                   format_func=dataset_label, key="dataset")
+
+st.title(f"📊 {dataset_label(dataset)} 四半期別セグメント業績分析ダッシュボード")
+
+try:
+    cube = registry.get(dataset)
+except ValueError as e:
+    # 決算年度のラベルが不正な場合など（data_loader.parse_quarter_labels）
+    st.error(f"データを読み込めません: {e}")
+    st.stop()
+
+if cube is not None:
     # 四半期リスト取得（ソート済み）
-    raw_quarters = sorted(df_raw['決算年度'].unique(), key=sort_quarter_key)
+    raw_quarters = cube.quarters
     
     # 分析期間選択
     st.sidebar.subheader("📅 分析期間")
@@ -146,18 +445,17 @@ if df_raw is not None:
     with col_end:
         end_q = st.selectbox("終了四半期", raw_quarters, index=len(raw_quarters)-1)
     
-    # 期間でフィルタリング
-    start_idx = raw_quarters.index(start_q)
-    end_idx = raw_quarters.index(end_q)
-    if start_idx > end_idx:
+    # 期間でフィルタリング（キューブの四半期軸をスライス）
+    if cube.quarter_index[start_q] > cube.quarter_index[end_q]:
         st.sidebar.error("開始四半期は終了四半期より前を選択してください")
         st.stop()
     
-    selected_quarters = raw_quarters[start_idx:end_idx+1]
-    df_filtered = df_raw[df_raw['決算年度'].isin(selected_quarters)].copy()
+    view = cube.period(start_q, end_q)
+    selected_quarters = view.quarters
+    diagnostics.annotate(dataset=dataset, start_q=start_q, end_q=end_q)
     
     # セグメントリスト取得
-    segment_list = df_filtered['セグメント'].unique().tolist()
+    segment_list = view.segments_present()
     
     # セグメント詳細分析用の選択
     st.sidebar.markdown("---")
@@ -167,321 +465,52 @@ if df_raw is not None:
     # 分析期間の表示
     st.sidebar.markdown("---")
     st.sidebar.info(f"📊 分析期間: {start_q} 〜 {end_q}\n\n📈 四半期数: {len(selected_quarters)}")
+    
+    # 表示モード（ビュー切替では選択中のビューだけが計算・描画される）
+    st.sidebar.markdown("---")
+    view_mode = st.sidebar.radio("🖥️ 表示モード", [VIEW_MODE_SINGLE, VIEW_MODE_TABS])
 
-    # --- タブ構成 ---
-    tab_overview, tab_composition, tab_margin, tab_growth, tab_detail = st.tabs([
-        "📊 全体概要", "📈 構成比推移", "💹 利益率推移", "🚀 成長率分析", "🔍 セグメント詳細"
-    ])
-
-    # --- 色パレット定義 ---
-    segment_colors = {
-        'GMS事業': '#1f77b4',
-        'SM事業': '#ff7f0e',
-        'H&W事業': '#2ca02c',
-        '総合金融事業': '#d62728',
-        'ディベロッパー事業': '#9467bd',
-        'サービス・専門店事業': '#8c564b',
-        '国際事業': '#e377c2',
-        'DS事業': '#7f7f7f',
-        'その他': '#bcbd22'
-    }
-
-    # ==========================================================
-    # タブ1: 全体概要
-    # ==========================================================
-    with tab_overview:
-        st.subheader("セグメント別収益・利益の推移（四半期）")
-        
-        # 営業収益の積み上げ棒グラフ
-        pivot_revenue = df_filtered.pivot_table(
-            index='決算年度', columns='セグメント', values='営業収益', aggfunc='sum'
-        ).reindex(selected_quarters)
-        
-        fig1, ax1 = plt.subplots(figsize=(14, 6))
-        pivot_revenue.plot(kind='bar', stacked=True, ax=ax1, 
-                          color=[segment_colors.get(s, '#333') for s in pivot_revenue.columns])
-        ax1.set_title('セグメント別営業収益の推移（積み上げ）', fontsize=14, fontweight='bold')
-        ax1.set_xlabel('決算四半期')
-        ax1.set_ylabel('営業収益（百万円）')
-        ax1.legend(title='セグメント', bbox_to_anchor=(1.02, 1), loc='upper left')
-        ax1.tick_params(axis='x', rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig1)
-        
-        # 営業利益の積み上げ棒グラフ
-        pivot_profit = df_filtered.pivot_table(
-            index='決算年度', columns='セグメント', values='営業利益', aggfunc='sum'
-        ).reindex(selected_quarters)
-        
-        fig2, ax2 = plt.subplots(figsize=(14, 6))
-        pivot_profit.plot(kind='bar', stacked=True, ax=ax2, 
-                         color=[segment_colors.get(s, '#333') for s in pivot_profit.columns])
-        ax2.set_title('セグメント別営業利益の推移（積み上げ）', fontsize=14, fontweight='bold')
-        ax2.set_xlabel('決算四半期')
-        ax2.set_ylabel('営業利益（百万円）')
-        ax2.axhline(y=0, color='black', linewidth=0.5)
-        ax2.legend(title='セグメント', bbox_to_anchor=(1.02, 1), loc='upper left')
-        ax2.tick_params(axis='x', rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig2)
-        
-        # 営業収益テーブル
-        st.markdown("#### 営業収益一覧（百万円）")
-        revenue_table = pivot_revenue.T.copy()
-        st.dataframe(revenue_table.style.format("{:,.0f}"), use_container_width=True)
-        html_content = get_html_report(revenue_table, f"セグメント別営業収益（{start_q}〜{end_q}）", fig1)
-        st.download_button("📥 HTMLでダウンロード（チャート＋テーブル）", html_content, "四半期_営業収益レポート.html", "text/html", key="revenue_html")
-        
-        # 営業利益テーブル
-        st.markdown("#### 営業利益一覧（百万円）")
-        profit_table = pivot_profit.T.copy()
-        st.dataframe(profit_table.style.format("{:,.0f}"), use_container_width=True)
-        html_content2 = get_html_report(profit_table, f"セグメント別営業利益（{start_q}〜{end_q}）", fig2)
-        st.download_button("📥 HTMLでダウンロード（チャート＋テーブル）", html_content2, "四半期_営業利益レポート.html", "text/html", key="profit_html")
-
-    # ==========================================================
-    # タブ2: 構成比推移
-    # ==========================================================
-    with tab_composition:
-        st.subheader("セグメント別構成比の推移（四半期）")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # 営業収益構成比
-            fig3, ax3 = plt.subplots(figsize=(10, 6))
-            for segment in segment_list:
-                seg_data = df_filtered[df_filtered['セグメント'] == segment].sort_values('ソートキー')
-                ax3.plot(seg_data['決算年度'], seg_data['営業収益構成比'], 
-                        marker='o', label=segment, color=segment_colors.get(segment, '#333'))
-            ax3.set_title('営業収益構成比の推移', fontsize=14, fontweight='bold')
-            ax3.set_xlabel('決算四半期')
-            ax3.set_ylabel('構成比（%）')
-            ax3.legend(bbox_to_anchor=(1.02, 1), loc='upper left', fontsize=8)
-            ax3.tick_params(axis='x', rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig3)
-        
-        with col2:
-            # 営業利益構成比
-            fig4, ax4 = plt.subplots(figsize=(10, 6))
-            for segment in segment_list:
-                seg_data = df_filtered[df_filtered['セグメント'] == segment].sort_values('ソートキー')
-                ax4.plot(seg_data['決算年度'], seg_data['営業利益構成比'], 
-                        marker='o', label=segment, color=segment_colors.get(segment, '#333'))
-            ax4.set_title('営業利益構成比の推移', fontsize=14, fontweight='bold')
-            ax4.set_xlabel('決算四半期')
-            ax4.set_ylabel('構成比（%）')
-            ax4.axhline(y=0, color='black', linewidth=0.5)
-            ax4.legend(bbox_to_anchor=(1.02, 1), loc='upper left', fontsize=8)
-            ax4.tick_params(axis='x', rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig4)
-        
-        # 構成比テーブル（クロス集計）
-        st.markdown("#### 営業収益構成比一覧（%）")
-        crosstab_rev = pd.crosstab(
-            df_filtered['セグメント'], df_filtered['決算年度'], 
-            values=df_filtered['営業収益構成比'], aggfunc='sum'
-        ).reindex(columns=selected_quarters)
-        crosstab_rev = crosstab_rev.sort_values(selected_quarters[-1], ascending=False)
-        st.dataframe(crosstab_rev.style.format("{:.1f}"), use_container_width=True)
-        html_comp1 = get_html_report(crosstab_rev, f"営業収益構成比（{start_q}〜{end_q}）", fig3)
-        st.download_button("📥 HTMLでダウンロード（チャート＋テーブル）", html_comp1, "四半期_営業収益構成比レポート.html", "text/html", key="comp_rev_html")
-        
-        st.markdown("#### 営業利益構成比一覧（%）")
-        crosstab_profit = pd.crosstab(
-            df_filtered['セグメント'], df_filtered['決算年度'], 
-            values=df_filtered['営業利益構成比'], aggfunc='sum'
-        ).reindex(columns=selected_quarters)
-        crosstab_profit = crosstab_profit.sort_values(selected_quarters[-1], ascending=False)
-        st.dataframe(crosstab_profit.style.format("{:.1f}"), use_container_width=True)
-        html_comp2 = get_html_report(crosstab_profit, f"営業利益構成比（{start_q}〜{end_q}）", fig4)
-        st.download_button("📥 HTMLでダウンロード（チャート＋テーブル）", html_comp2, "四半期_営業利益構成比レポート.html", "text/html", key="comp_profit_html")
-
-    # ==========================================================
-    # タブ3: 利益率推移
-    # ==========================================================
-    with tab_margin:
-        st.subheader("セグメント別営業利益率の推移（四半期）")
-        
-        fig6, ax6 = plt.subplots(figsize=(14, 7))
-        for segment in segment_list:
-            seg_data = df_filtered[df_filtered['セグメント'] == segment].sort_values('ソートキー')
-            ax6.plot(seg_data['決算年度'], seg_data['営業利益率'], 
-                    marker='o', label=segment, color=segment_colors.get(segment, '#333'), linewidth=2)
-        ax6.set_title('セグメント別営業利益率の推移', fontsize=14, fontweight='bold')
-        ax6.set_xlabel('決算四半期')
-        ax6.set_ylabel('営業利益率（%）')
-        ax6.axhline(y=0, color='black', linewidth=0.5)
-        ax6.legend(bbox_to_anchor=(1.02, 1), loc='upper left')
-        ax6.tick_params(axis='x', rotation=45)
-        ax6.grid(True, alpha=0.3)
-        plt.tight_layout()
-        st.pyplot(fig6)
-        
-        # 営業利益率テーブル
-        st.markdown("#### 営業利益率一覧（%）")
-        crosstab_margin = pd.crosstab(
-            df_filtered['セグメント'], df_filtered['決算年度'], 
-            values=df_filtered['営業利益率'], aggfunc='sum'
-        ).reindex(columns=selected_quarters)
-        crosstab_margin = crosstab_margin.sort_values(selected_quarters[-1], ascending=False)
-        st.dataframe(crosstab_margin.style.format("{:.1f}"), use_container_width=True)
-        
-        html_content3 = get_html_report(crosstab_margin, f"セグメント別営業利益率（{start_q}〜{end_q}）", fig6)
-        st.download_button("📥 HTMLでダウンロード（チャート＋テーブル）", html_content3, "四半期_営業利益率レポート.html", "text/html", key="margin_html")
-
-    # ==========================================================
-    # タブ4: 成長率分析
-    # ==========================================================
-    with tab_growth:
-        st.subheader(f"セグメント別営業収益成長率（{start_q}基準）")
-        
-        # 成長率計算（start_q基準、「その他」を除外）
-        growth_segments = [s for s in segment_list if s != 'その他']
-        
-        growth_df = pd.DataFrame()
-        for segment in growth_segments:
-            seg_data = df_filtered[df_filtered['セグメント'] == segment].sort_values('ソートキー').copy()
-            if not seg_data.empty:
-                base_value = seg_data.iloc[0]['営業収益']
-                if base_value > 0:
-                    seg_data[f'営業収益成長率(対{start_q})'] = np.round(seg_data['営業収益'] / base_value, 2)
-                    growth_df = pd.concat([growth_df, seg_data], axis=0)
-        
-        growth_df = growth_df.reset_index(drop=True)
-        
-        if not growth_df.empty:
-            fig7, ax7 = plt.subplots(figsize=(14, 7))
-            for segment in growth_segments:
-                seg_data = growth_df[growth_df['セグメント'] == segment].sort_values('ソートキー')
-                if not seg_data.empty:
-                    ax7.plot(seg_data['決算年度'], seg_data[f'営業収益成長率(対{start_q})'], 
-                            marker='o', label=segment, color=segment_colors.get(segment, '#333'), linewidth=2)
-            ax7.set_title(f'セグメント別営業収益成長率（{start_q}=1.00）', fontsize=14, fontweight='bold')
-            ax7.set_xlabel('決算四半期')
-            ax7.set_ylabel('成長率（倍）')
-            ax7.axhline(y=1.0, color='black', linewidth=0.5, linestyle='--')
-            ax7.legend(bbox_to_anchor=(1.02, 1), loc='upper left')
-            ax7.tick_params(axis='x', rotation=45)
-            ax7.grid(True, alpha=0.3)
-            plt.tight_layout()
-            st.pyplot(fig7)
-            
-            # 成長率テーブル
-            st.markdown(f"#### 営業収益成長率一覧（{start_q}=1.00）")
-            crosstab_growth = pd.crosstab(
-                growth_df['セグメント'], growth_df['決算年度'], 
-                values=growth_df[f'営業収益成長率(対{start_q})'], aggfunc='sum'
-            ).reindex(columns=selected_quarters)
-            crosstab_growth = crosstab_growth.sort_values(selected_quarters[-1], ascending=False)
-            st.dataframe(crosstab_growth.style.format("{:.2f}"), use_container_width=True)
-            
-            html_growth = get_html_report(crosstab_growth, f"セグメント別営業収益成長率（{start_q}基準）", fig7)
-            st.download_button("📥 HTMLでダウンロード（チャート＋テーブル）", html_growth, "四半期_成長率レポート.html", "text/html", key="growth_html")
-        else:
-            st.warning("成長率を計算できるデータがありません。")
-
-    # ==========================================================
-    # タブ5: セグメント詳細
-    # ==========================================================
-    with tab_detail:
-        st.subheader(f"🔍 {selected_segment} - 詳細分析（四半期）")
-        
-        # セグメントデータ抽出
-        seg_detail = df_filtered[df_filtered['セグメント'] == selected_segment].sort_values('ソートキー').copy()
-        
-        if not seg_detail.empty:
-            # 成長率計算
-            base_revenue = seg_detail.iloc[0]['営業収益']
-            if base_revenue > 0:
-                seg_detail['営業収益成長率'] = np.round(seg_detail['営業収益'] / base_revenue, 2)
-            else:
-                seg_detail['営業収益成長率'] = 0
-            
-            # 前期比成長率計算
-            seg_detail['営業収益対前期成長率'] = np.round(
-                (seg_detail['営業収益'] / seg_detail['営業収益'].shift(1) - 1) * 100, 1
-            )
-            seg_detail.loc[seg_detail.index[0], '営業収益対前期成長率'] = np.nan
-            
-            quarters_display = seg_detail['決算年度'].tolist()
-            
-            # 2x2サブプロット
-            fig8, axs = plt.subplots(2, 2, figsize=(14, 10))
-            
-            # 営業収益
-            axs[0, 0].bar(quarters_display, seg_detail['営業収益'], color='skyblue')
-            axs[0, 0].set_title('営業収益', fontsize=12, fontweight='bold')
-            axs[0, 0].set_ylabel('金額（百万円）')
-            axs[0, 0].tick_params(axis='x', rotation=90)
-            
-            # 営業利益
-            colors = ['orange' if v >= 0 else 'red' for v in seg_detail['営業利益']]
-            axs[0, 1].bar(quarters_display, seg_detail['営業利益'], color=colors)
-            axs[0, 1].set_title('営業利益', fontsize=12, fontweight='bold')
-            axs[0, 1].set_ylabel('金額（百万円）')
-            axs[0, 1].axhline(y=0, color='black', linewidth=0.5)
-            axs[0, 1].tick_params(axis='x', rotation=90)
-            
-            # 営業収益成長率
-            axs[1, 0].plot(quarters_display, seg_detail['営業収益成長率'], marker='o', color='green', linewidth=2)
-            axs[1, 0].set_title(f'営業収益成長率（{start_q}=1.00）', fontsize=12, fontweight='bold')
-            axs[1, 0].set_ylabel('成長率（倍）')
-            axs[1, 0].axhline(y=1.0, color='black', linewidth=0.5, linestyle='--')
-            axs[1, 0].tick_params(axis='x', rotation=90)
-            axs[1, 0].grid(True, alpha=0.3)
-            
-            # 営業利益率
-            axs[1, 1].plot(quarters_display, seg_detail['営業利益率'], marker='o', color='purple', linewidth=2)
-            axs[1, 1].set_title('営業利益率', fontsize=12, fontweight='bold')
-            axs[1, 1].set_ylabel('利益率（%）')
-            axs[1, 1].axhline(y=0, color='black', linewidth=0.5)
-            axs[1, 1].tick_params(axis='x', rotation=90)
-            axs[1, 1].grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            st.pyplot(fig8)
-            
-            # 詳細テーブル
-            st.markdown("#### 業績推移テーブル")
-            display_cols = ['決算年度', '営業収益', '営業利益', '営業収益成長率', '営業収益対前期成長率', '営業利益率']
-            display_df = seg_detail[display_cols].copy()
-            display_df = display_df.set_index('決算年度')
-            
-            format_dict = {
-                '営業収益': '{:,.0f}',
-                '営業利益': '{:,.0f}',
-                '営業収益成長率': '{:.2f}',
-                '営業収益対前期成長率': '{:.1f}',
-                '営業利益率': '{:.1f}'
-            }
-            st.dataframe(display_df.style.format(format_dict), use_container_width=True)
-            
-            # 構成比テーブル（横持ち・バーチャート風スタイル）
-            st.markdown("#### 構成比推移")
-            comp_df = seg_detail[['決算年度', '営業収益構成比', '営業利益構成比']].copy()
-            comp_df = comp_df.set_index('決算年度').T
-            
-            st.dataframe(
-                comp_df.style.format("{:.1f}%").bar(subset=comp_df.columns, color='skyblue', vmin=0),
-                use_container_width=True
-            )
-            
-            html_content4 = get_html_report(display_df, f"{selected_segment} - 四半期業績推移（{start_q}〜{end_q}）", fig8)
-            st.download_button(f"📥 HTMLでダウンロード（チャート＋テーブル）", html_content4, f"{selected_segment}_四半期詳細レポート.html", "text/html", key="detail_html")
-        
-        else:
-            st.warning("選択されたセグメントのデータが見つかりません。")
+    # チャートの描画方式（HTMLレポートは常に matplotlib の画像）
+    backend_options = list(CHART_BACKENDS.values())
+    st.sidebar.radio("📈 チャート描画", backend_options, index=backend_options.index(DEFAULT_CHART_BACKEND),
+                     key="chart_backend")
+
+    # レポート出力（チャートの埋め込み形式・gzip圧縮・総合レポート）
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("📥 レポート出力")
+    st.sidebar.radio("チャート形式", list(reports.REPORT_FORMATS), format_func=reports.REPORT_FORMATS.get,
+                     horizontal=True, key="report_format")
+    st.sidebar.checkbox("gzip圧縮（.html.gz）", key="report_gzip")
+    report_download_button(view, None, selected_segment, label="📥 総合レポート（全ビューを1ファイル）",
+                           container=st.sidebar)
+
+    diagnostics.annotate(view_mode=view_mode, chart_backend=st.session_state["chart_backend"])
+
+    if view_mode == VIEW_MODE_TABS:
+        # --- タブ構成（全ビューを毎回計算） ---
+        prerender_charts(view, list(VIEWS), selected_segment)
+        tabs = st.tabs(list(VIEWS))
+        for tab, label in zip(tabs, VIEWS):
+            with tab:
+                render_view(label, view, segment_list, selected_segment)
+    else:
+        # --- ビュー切替（選択中のビューのみ計算） ---
+        selected_view = st.radio("表示するビュー", list(VIEWS), horizontal=True, label_visibility="collapsed")
+        prerender_charts(view, [selected_view], selected_segment)
+        render_view(selected_view, view, segment_list, selected_segment)
 
 else:
     st.error("データファイルが見つかりません。リポジトリの data/ フォルダを確認してください。")
 
 # --- フッター ---
 st.divider()
-st.markdown("""
+st.markdown(f"""
 <div style="text-align: center; color: #888; font-size: 12px;">
-    📊 イオン 四半期別セグメント業績分析ダッシュボード | Powered by Streamlit
+    📊 {dataset_label(dataset)} 四半期別セグメント業績分析ダッシュボード | Powered by Streamlit
 </div>
 """, unsafe_allow_html=True)
+
+# --- 診断情報（DIAGNOSTICS=1 のときのみ） ---
+diagnostics_record = diagnostics.end()
+if diagnostics_record is not None:
+    show_diagnostics(diagnostics_record)
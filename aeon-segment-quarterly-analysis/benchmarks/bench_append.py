@@ -0,0 +1,103 @@
+"""差分取り込み（ingest.append_rows）の検証と計測（CSVの全件再読み込みとの比較）
+
+元のCSVから直近の四半期の行を取り除いたコピーを作り、取り除いた行を差分CSVとして取り込み直す。
+次のことを確認してから、取り込みと全件再読み込みの時間を比較する。
+- 追記後のCSVの行が元のCSVと同じ（行の順序を除いて、金額の書式 "903,994 " 等もそのまま）
+- merge_sorted の結果・書き戻したスナップショットが、CSVを全件読み込み直した結果と一致する
+- 取り込み後のキューブの内容ハッシュが全件読み込みと一致し、取り込んだ四半期を含まない期間は変わらない
+比較対象の全件再読み込みは、CSVの読み込み・正規化とスナップショットの書き出し（取り込みを使わない場合の更新）。
+
+    python benchmarks/bench_append.py                    # data/segment_data.csv の直近2四半期
+    python benchmarks/bench_append.py --quarters 4
+    python benchmarks/bench_append.py --synthetic 500 400
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analysis  # noqa: E402
+import data_loader  # noqa: E402
+import ingest  # noqa: E402
+import snapshot  # noqa: E402
+import synthetic  # noqa: E402
+from cube import SegmentCube  # noqa: E402
+
+DATA_CSV = os.path.join(ROOT, 'data', 'segment_data.csv')
+
+
+def split_csv(src, base_path, delta_path, n_quarters):
+    """CSVを直近 n 四半期の行（差分）とそれ以外に分ける（行のテキストはそのまま）"""
+    labels = data_loader.read_segment_csv(src)['決算年度']
+    quarterly = labels[labels.str.contains('Q')]
+    removed = set(sorted(quarterly.unique(), key=analysis.sort_quarter_key)[-n_quarters:])
+    with open(src, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    base, delta = [lines[0]], [lines[0]]
+    for line, label in zip(lines[1:], labels):
+        (delta if label in removed else base).append(line)
+    for path, part in [(base_path, base), (delta_path, delta)]:
+        with open(path, 'wb') as f:
+            f.write(b''.join(part))
+    return sorted(removed, key=analysis.sort_quarter_key)
+
+
+def data_lines(path):
+    with open(path, 'rb') as f:
+        return sorted(f.read().splitlines()[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=DATA_CSV, help='元のCSV（既定: data/segment_data.csv）')
+    parser.add_argument('--synthetic', type=int, nargs=2, metavar=('SEGMENTS', 'QUARTERS'),
+                        help='元のCSVの代わりに合成データを使う')
+    parser.add_argument('--quarters', type=int, default=2, help='取り込み直す直近の四半期数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'source.csv')
+        if args.synthetic:
+            synthetic.write_csv(src, *args.synthetic)
+        else:
+            shutil.copyfile(args.csv, src)
+        csv_path = os.path.join(tmp, 'segment_data.csv')
+        delta_path = os.path.join(tmp, 'delta.csv')
+        removed = split_csv(src, csv_path, delta_path, args.quarters)
+        snapshot.write_snapshot(csv_path)
+        before = SegmentCube.from_frame(snapshot.read_snapshot(csv_path))
+
+        start = time.perf_counter()
+        added, total = ingest.ingest_file(csv_path, delta_path)
+        t_append = time.perf_counter() - start
+
+        assert data_lines(csv_path) == data_lines(src), "追記後のCSVの行が元のCSVと一致しません"
+        merged = snapshot.read_snapshot(csv_path)
+        assert merged is not None, "スナップショットが書き戻されていません"
+        start = time.perf_counter()
+        reloaded = snapshot.encode_categories(data_loader.load_segment_frame(csv_path))
+        snapshot.write_snapshot(csv_path, reloaded)
+        t_reload = time.perf_counter() - start
+        pd.testing.assert_frame_equal(merged.astype({c: str for c in snapshot.CATEGORY_COLUMNS}),
+                                      reloaded.astype({c: str for c in snapshot.CATEGORY_COLUMNS}))
+
+        after, full = SegmentCube.from_frame(merged), SegmentCube.from_frame(reloaded)
+        assert after.version == full.version
+        old = (before.quarters[0], before.quarters[-1])
+        assert after.period(*old).version == before.period(*old).version
+
+        print(f"re-ingested {removed}: +{added} rows ({total} quarterly rows) - CSV, snapshot and cube match")
+        print(f"append_rows : {t_append * 1000:8.1f} ms")
+        print(f"full reload : {t_reload * 1000:8.1f} ms  ({t_reload / t_append:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
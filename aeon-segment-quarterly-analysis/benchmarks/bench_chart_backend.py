@@ -0,0 +1,69 @@
+"""チャート描画方式ごとのサーバーCPU時間（1回の再実行で全チャートを描画した場合）
+
+matplotlib（Figure 構築 + PNG エンコード）と Vega-Lite（仕様の構築 + JSON 化）を比べる。
+どちらもキャッシュを通さない、キャッシュミス時のコスト。
+
+    python benchmarks/bench_chart_backend.py
+    python benchmarks/bench_chart_backend.py --repeat 5 --periods all last4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import charts  # noqa: E402
+import export_reports  # noqa: E402
+import reports  # noqa: E402
+import vega_charts  # noqa: E402
+from datasets import DatasetRegistry  # noqa: E402
+
+
+def render_png(view, chart_id, segment):
+    fig = reports.build_chart(view, chart_id, segment)
+    return charts.figure_to_bytes(fig) if fig is not None else b''
+
+
+def render_vega(view, chart_id, segment):
+    spec = vega_charts.build_spec(view, chart_id, segment)
+    return json.dumps(spec, ensure_ascii=False).encode('utf-8') if spec is not None else b''
+
+
+BACKENDS = {'matplotlib': render_png, 'vega-lite': render_vega}
+
+
+def measure(render, view, segment, repeat):
+    """全チャートを描画した1回あたりの (CPU秒, 送信バイト数)"""
+    best, size = None, 0
+    for _ in range(repeat):
+        start = time.process_time()
+        size = sum(len(render(view, chart_id, segment)) for chart_id in reports.REPORTS)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dataset', default='segment_data')
+    parser.add_argument('--periods', nargs='+', choices=list(export_reports.PERIODS), default=['all', 'last4'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    charts.setup_matplotlib()
+    cube = DatasetRegistry(export_reports.DATA_DIR).get(args.dataset)
+    print(f"{'period':>8} {'backend':>11} {'cpu ms/rerun':>13} {'payload KB':>11}")
+    for period in args.periods:
+        view = cube.period(*export_reports.period_range(cube.quarters, period))
+        segment = view.segments_present()[0]
+        for name, render in BACKENDS.items():
+            render(view, 'revenue', segment)  # ウォームアップ
+            cpu, size = measure(render, view, segment, args.repeat)
+            print(f"{period:>8} {name:>11} {cpu * 1000:13.1f} {size / 1024:11.1f}")
+
+
+if __name__ == '__main__':
+    main()
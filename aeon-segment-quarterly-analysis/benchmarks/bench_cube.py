@@ -0,0 +1,112 @@
+"""キューブ構築・セグメント別の取り出しのベンチマーク（文字列キー vs カテゴリのコード・四半期の通し番号）
+
+従来の実装（セグメント・決算年度の文字列で groupby し、四半期ラベルを1つずつ解析して並べ替え、
+セグメント詳細は成長指標をラベルで .loc 参照）と、現在の実装（SegmentCube.from_frame・
+analysis.segment_detail）を、セグメント数 × 四半期数の合成データで比較する。結果が一致することも確認する。
+
+    python benchmarks/bench_cube.py
+    python benchmarks/bench_cube.py --segments 100 500 --quarters 100 400 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analysis  # noqa: E402
+import data_loader  # noqa: E402
+import snapshot  # noqa: E402
+import synthetic  # noqa: E402
+from cube import METRICS, SegmentCube  # noqa: E402
+from metrics import GrowthMetrics  # noqa: E402
+
+
+def legacy_sort_quarter_key(q):
+    """従来のソートキー（解析できないラベルは (0, 0)）"""
+    try:
+        if '-' in q:
+            parts = q.replace('FY', '').split('-')
+            return (int(parts[0]), int(parts[1].replace('Q', '')))
+        return (int(q.replace('FY', '')), 0)
+    except Exception:
+        return (0, 0)
+
+
+def legacy_from_frame(df):
+    """従来のキューブ構築（文字列キーの groupby と get_indexer）"""
+    metrics = [m for m in METRICS if m in df.columns]
+    segments = sorted(df['セグメント'].unique().tolist())
+    quarters = sorted(df['決算年度'].unique().tolist(), key=legacy_sort_quarter_key)
+    grouped = df.groupby(['セグメント', '決算年度'], sort=False, observed=True)[metrics].sum(min_count=1)
+    seg_idx = pd.Index(segments).get_indexer(grouped.index.get_level_values(0))
+    q_idx = pd.Index(quarters).get_indexer(grouped.index.get_level_values(1))
+    values = np.full((len(segments), len(quarters), len(metrics)), np.nan)
+    values[seg_idx, q_idx] = grouped.to_numpy(dtype=float)
+    present = np.zeros((len(segments), len(quarters)), dtype=bool)
+    present[seg_idx, q_idx] = True
+    return values, present, segments, quarters
+
+
+def legacy_segment_detail(view, segment, growth):
+    """従来のセグメント詳細（成長指標を四半期ラベルで .loc 参照）"""
+    seg_detail = view.segment_frame(segment)
+    quarters = seg_detail['決算年度']
+    seg_detail['営業収益成長率'] = growth.index.loc[segment, quarters].fillna(0).to_numpy()
+    seg_detail['営業収益対前期成長率'] = growth.qoq.loc[segment, quarters].to_numpy()
+    seg_detail['営業収益前年同期比'] = growth.yoy.loc[segment, quarters].to_numpy()
+    return seg_detail
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, nargs='+', default=[9, 100, 500])
+    parser.add_argument('--quarters', type=int, nargs='+', default=[32, 100, 400])
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最小値を採用）')
+    args = parser.parse_args()
+
+    print(f"{'segments':>8} {'quarters':>8} {'case':<16} {'legacy ms':>10} {'cube ms':>9} {'speedup':>8}")
+    for n_segments in args.segments:
+        for n_quarters in args.quarters:
+            df = snapshot.encode_categories(data_loader.normalize_segment_frame(
+                synthetic.make_frame(n_segments, n_quarters)))
+            cube = SegmentCube.from_frame(df)
+            legacy = legacy_from_frame(df)
+            assert cube.segments == legacy[2] and cube.quarters == legacy[3]
+            assert np.array_equal(cube.values, legacy[0], equal_nan=True)
+            assert np.array_equal(cube.present, legacy[1])
+
+            view = cube.period(cube.quarters[0], cube.quarters[-1])
+            growth = GrowthMetrics(view)
+            segments = view.segments_present()
+            for segment in segments[:3]:
+                pd.testing.assert_frame_equal(analysis.segment_detail(view, segment, growth),
+                                              legacy_segment_detail(view, segment, growth))
+
+            cases = {
+                'from_frame': (lambda: legacy_from_frame(df), lambda: SegmentCube.from_frame(df)),
+                'segment_detail': (lambda: [legacy_segment_detail(view, s, growth) for s in segments],
+                                   lambda: [analysis.segment_detail(view, s, growth) for s in segments]),
+            }
+            for name, (old, new) in cases.items():
+                t_old = best_of(old, args.repeat)
+                t_new = best_of(new, args.repeat)
+                print(f"{n_segments:>8} {n_quarters:>8} {name:<16} {t_old:10.2f} {t_new:9.2f} {t_old / t_new:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""レポート一括出力のスケーリング計測（ワーカー数ごとのスループット）
+
+    python benchmarks/bench_export.py                  # 1, 2, 4, ... CPUコア数
+    python benchmarks/bench_export.py --workers 1 4 8 --periods all last4
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import export_reports  # noqa: E402
+from datasets import DatasetRegistry  # noqa: E402
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    counts, n = [], 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    return counts + [cores]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers())
+    parser.add_argument('--periods', nargs='+', choices=list(export_reports.PERIODS), default=['all', 'last4'])
+    args = parser.parse_args()
+
+    registry = DatasetRegistry(export_reports.DATA_DIR)
+    print(f"{'workers':>7} {'reports':>8} {'seconds':>8} {'reports/s':>10} {'scaling':>8}")
+    baseline = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as out:
+            jobs = export_reports.plan_jobs(registry, out, registry.names(), args.periods, list(export_reports.reports.REPORTS))
+            count, _, elapsed = export_reports.run(jobs, export_reports.DATA_DIR, workers)
+        throughput = count / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>7} {count:>8} {elapsed:8.1f} {throughput:10.2f} {throughput / baseline:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""CSV読み込みのベンチマーク（従来方式 vs data_loader vs 列指向スナップショット）
+
+実データ（data/segment_data.csv）をセグメント名を変えて N 倍に複製した
+cp932 の合成CSVを作り、読み込み〜正規化までの時間を比較する。
+
+    python benchmarks/bench_ingest.py            # 1000倍（約40万行）
+    python benchmarks/bench_ingest.py --scale 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_loader  # noqa: E402
+import snapshot  # noqa: E402
+
+SOURCE_CSV = os.path.join(ROOT, "data", "segment_data.csv")
+
+
+def make_synthetic_csv(path, scale):
+    """実データをセグメント名を変えて scale 倍に複製（元ファイルと同じ cp932・桁区切り付き）"""
+    with open(SOURCE_CSV, 'rb') as f:
+        header, *rows = f.read().decode('cp932').splitlines()
+    lines = [header]
+    for i in range(scale):
+        suffix = f"_{i:04d}," if i else ","
+        lines.extend(row.replace(",", suffix, 1) for row in rows)
+    with open(path, 'wb') as f:
+        f.write(("\r\n".join(lines) + "\r\n").encode('cp932'))
+    return len(lines) - 1
+
+
+def legacy_sort_quarter_key(q):
+    """従来のソートキー（解析できないラベルは (0, 0)）"""
+    try:
+        if '-' in q:
+            parts = q.replace('FY', '').split('-')
+            return (int(parts[0]), int(parts[1].replace('Q', '')))
+        return (int(q.replace('FY', '')), 0)
+    except Exception:
+        return (0, 0)
+
+
+def legacy_load(path):
+    """従来の読み込み処理（エンコーディング総当たり・列ごとの文字列変換・applyによるソートキー）"""
+    df = None
+    for encoding in ['utf-8', 'cp932', 'shift_jis', 'utf-8-sig']:
+        try:
+            df = pd.read_csv(path, encoding=encoding)
+            break
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+    df = df[df['決算種別'].isin(['Q1', 'Q2', 'Q3', 'Q4'])].reset_index(drop=True)
+    for col in ['営業収益', '営業利益', '設備投資']:
+        if df[col].dtype == 'object':
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0)
+    df['営業利益率'] = np.round(df['営業利益率'], 1)
+    df['ソートキー'] = df['決算年度'].apply(lambda x: legacy_sort_quarter_key(x))
+    return df.sort_values(['セグメント', 'ソートキー']).reset_index(drop=True)
+
+
+def best_of(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1000, help='元データに対する倍率')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最小値を採用）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'segment_data.csv')
+        n_rows = make_synthetic_csv(path, args.scale)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"synthetic csv: {n_rows:,} rows, {size_mb:.1f} MB (x{args.scale})")
+
+        # 結果が一致することを確認
+        legacy = legacy_load(path)
+        fast = data_loader.load_segment_frame(path)
+        assert legacy['決算年度'].tolist() == fast['決算年度'].tolist()
+        assert np.allclose(legacy['営業収益'].to_numpy(float), fast['営業収益'].to_numpy())
+
+        t_legacy = best_of(legacy_load, path, args.repeat)
+        t_fast = best_of(data_loader.load_segment_frame, path, args.repeat)
+        print(f"legacy      : {t_legacy:8.3f} s")
+        print(f"data_loader : {t_fast:8.3f} s  ({t_legacy / t_fast:.1f}x)")
+
+        snapshot.write_snapshot(path)
+        assert snapshot.read_snapshot(path) is not None
+        t_snap = best_of(snapshot.read_snapshot, path, args.repeat)
+        snap_mb = os.path.getsize(snapshot.snapshot_path(path)) / 1e6
+        print(f"snapshot    : {t_snap:8.3f} s  ({t_legacy / t_snap:.1f}x, {snap_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""成長指標計算のベンチマーク（従来のセグメント別ループ vs metrics.GrowthMetrics）
+
+セグメント数を増やした合成データで、成長率（期首基準）・前期比の計算時間を比較する。
+従来方式はセグメントごとに絞り込み・pd.concat を繰り返すため、セグメント数に対して
+線形より悪化する。GrowthMetrics は行列演算のみで、セグメントあたりの時間がほぼ一定になる。
+
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --segments 10 100 1000 5000 --legacy-max 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_loader  # noqa: E402
+import synthetic  # noqa: E402
+from cube import SegmentCube  # noqa: E402
+from metrics import GrowthMetrics  # noqa: E402
+
+
+def legacy_growth(df):
+    """従来方式：セグメントごとに絞り込み、成長率・前期比を計算して pd.concat"""
+    growth_df = pd.DataFrame()
+    for segment in df['セグメント'].unique().tolist():
+        seg_data = df[df['セグメント'] == segment].sort_values('四半期番号').copy()
+        base_value = seg_data.iloc[0]['営業収益']
+        if base_value > 0:
+            seg_data['成長率'] = np.round(seg_data['営業収益'] / base_value, 2)
+            seg_data['前期比'] = np.round((seg_data['営業収益'] / seg_data['営業収益'].shift(1) - 1) * 100, 1)
+            growth_df = pd.concat([growth_df, seg_data], axis=0)
+    return growth_df.reset_index(drop=True)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--years', type=int, default=10, help='四半期数 = 年数 × 4')
+    parser.add_argument('--legacy-max', type=int, default=1000, help='従来方式を計測する最大セグメント数')
+    args = parser.parse_args()
+
+    print(f"{'segments':>8} {'legacy s':>10} {'engine s':>10} {'engine us/seg':>14} {'speedup':>8}")
+    for n in args.segments:
+        df = data_loader.normalize_segment_frame(synthetic.make_frame(n, args.years * 4))
+        view = SegmentCube.from_frame(df, metrics=['営業収益'])
+        view = view.period(view.quarters[0], view.quarters[-1])
+        t_engine, metrics = timed(GrowthMetrics, view)
+
+        if n <= args.legacy_max:
+            t_legacy, legacy = timed(legacy_growth, df)
+            # 結果が一致することを確認
+            expected = legacy.pivot(index='セグメント', columns='決算年度', values='成長率')
+            assert np.allclose(expected[view.quarters].to_numpy(), metrics.index.to_numpy())
+            legacy_col, speedup = f"{t_legacy:10.3f}", f"{t_legacy / t_engine:7.0f}x"
+        else:
+            legacy_col, speedup = f"{'-':>10}", f"{'-':>8}"
+        print(f"{n:>8} {legacy_col} {t_engine:10.4f} {t_engine / n * 1e6:14.1f} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
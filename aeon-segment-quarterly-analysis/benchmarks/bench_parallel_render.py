@@ -0,0 +1,82 @@
+"""1回の再実行で表示するチャートの並列描画の計測（ワーカー数ごとの所要時間）
+
+タブ表示で描画する全チャート（全体概要〜セグメント詳細の7枚）を、順番に描画した場合と
+render_pool.RenderPool で並列に描画した場合の経過時間を比較する。出力が同じ PNG であることも確認する。
+
+    python benchmarks/bench_parallel_render.py                 # 2, 4, ... CPUコア数（最大4）
+    python benchmarks/bench_parallel_render.py --workers 2 4 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import reports  # noqa: E402
+from datasets import DatasetRegistry  # noqa: E402
+from render_pool import RenderPool, default_workers  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, 'data')
+CHARTS = ['revenue', 'profit', 'comp_rev', 'comp_profit', 'margin', 'growth', 'detail']
+
+
+def worker_counts():
+    top = max(2, default_workers())
+    counts, n = [], 2
+    while n < top:
+        counts.append(n)
+        n *= 2
+    return counts + [top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=worker_counts())
+    parser.add_argument('--repeat', type=int, default=3, help='繰り返し回数（中央値を表示）')
+    parser.add_argument('--dataset', default='segment_data')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    cube = DatasetRegistry(DATA_DIR).get(args.dataset)
+    view = cube.period(cube.quarters[0], cube.quarters[-1])
+    requests = [(chart_id, view.segments_present()[0]) for chart_id in CHARTS]
+
+    def serial():
+        return [reports.build_chart_png(view, chart_id, segment) for chart_id, segment in requests]
+
+    expected = serial()
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        serial()
+        times.append(time.perf_counter() - start)
+    base = statistics.median(times)
+    print(f"cores: {os.cpu_count()}, charts: {len(requests)}")
+    print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+    print(f"{'serial':>8} {base:8.2f} {1:7.1f}x")
+
+    for workers in args.workers:
+        pool = RenderPool(workers)
+        if not pool.warm_up():
+            print(f"{workers:>8} ワーカーを起動できませんでした", file=sys.stderr)
+            continue
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            pngs = pool.render(view, requests)
+            times.append(time.perf_counter() - start)
+        pool.shutdown()
+        if pngs != expected:
+            print(f"{workers:>8} 並列描画の結果が順番に描画した結果と一致しません", file=sys.stderr)
+            return 1
+        elapsed = statistics.median(times)
+        print(f"{workers:>8} {elapsed:8.2f} {base / elapsed:7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
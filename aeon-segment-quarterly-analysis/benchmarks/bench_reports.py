@@ -0,0 +1,58 @@
+"""HTMLレポートの出力形式ごとのサイズと生成時間
+
+個別レポート7種（セグメント詳細は1セグメント分）と総合レポートについて、
+PNG / SVG × 非圧縮 / gzip の組み合わせを比べる。
+
+    python benchmarks/bench_reports.py
+    python benchmarks/bench_reports.py --periods all last4 last12
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import charts  # noqa: E402
+import export_reports  # noqa: E402
+import reports  # noqa: E402
+from datasets import DatasetRegistry  # noqa: E402
+
+
+def timed(build):
+    start = time.perf_counter()
+    html = build()
+    return html, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dataset', default='segment_data')
+    parser.add_argument('--periods', nargs='+', choices=list(export_reports.PERIODS), default=['all', 'last4'])
+    args = parser.parse_args()
+
+    charts.setup_matplotlib()
+    cube = DatasetRegistry(export_reports.DATA_DIR).get(args.dataset)
+    print(f"{'period':>6} {'mode':>10} {'format':>6} {'seconds':>8} {'html KB':>8} {'gzip KB':>8}")
+    for period in args.periods:
+        view = cube.period(*export_reports.period_range(cube.quarters, period))
+        segment = view.segments_present()[0]
+        for fmt in reports.REPORT_FORMATS:
+            pages, elapsed = [], 0.0
+            for report_id in reports.REPORTS:
+                html, seconds = timed(lambda: reports.build_report(view, report_id, segment, fmt))
+                pages.append(html)
+                elapsed += seconds
+            combined, combined_elapsed = timed(lambda: reports.build_combined_report(view, [segment], fmt))
+            for mode, htmls, seconds in [('separate', pages, elapsed), ('combined', [combined], combined_elapsed)]:
+                size = sum(len(h.encode('utf-8')) for h in htmls)
+                start = time.perf_counter()
+                gz_size = sum(len(reports.compress_report(h)) for h in htmls)
+                seconds_gz = time.perf_counter() - start
+                print(f"{period:>6} {mode:>10} {fmt:>6} {seconds:8.2f} {size / 1024:8.0f} {gz_size / 1024:8.0f}"
+                      f"  (gzip +{seconds_gz * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""起動時間の計測（新しいプロセスでの初回表示までの時間と、再実行ごとのオーバーヘッド）
+
+AppTest でアプリを実行し、チャート描画方式ごとに次を計測する。
+- import: Streamlit・アプリの依存モジュールの読み込み時間
+- first render: プロセス起動後、最初の表示が完了するまで（import を含む）
+- rerun: ウィジェットを変更しない再実行（キャッシュ済みの状態でのスクリプト全体のオーバーヘッド）
+ブラウザ描画で matplotlib・チャート描画モジュール（charts.py・フォント登録）が読み込まれていないことも確認する。
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --max-first-render 4.0   # 超えたら終了コード1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+BACKENDS = ['vega', 'image']
+
+
+def child(backend, reruns):
+    """計測用の子プロセス（新しいインタプリタで1回だけ起動を計測して JSON を出力）"""
+    start = time.perf_counter()
+    os.environ['CHART_BACKEND'] = backend
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    import reports  # noqa: F401
+    import vega_charts  # noqa: F401
+    from datasets import DatasetRegistry  # noqa: F401
+    imported = time.perf_counter()
+
+    at = AppTest.from_file(APP, default_timeout=300).run()
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    first = time.perf_counter()
+
+    rerun_times = []
+    for _ in range(reruns):
+        t = time.perf_counter()
+        at.run()
+        rerun_times.append(time.perf_counter() - t)
+    print(json.dumps({
+        'import': imported - start,
+        'first_render': first - start,
+        'rerun': statistics.median(rerun_times),
+        'charts_loaded': 'charts' in sys.modules,
+        'matplotlib_loaded': 'matplotlib' in sys.modules,
+    }))
+
+
+def measure(backend, runs, reruns):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, __file__, '--child', backend, '--reruns', str(reruns)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    summary = {key: statistics.median(r[key] for r in results) for key in ['import', 'first_render', 'rerun']}
+    for key in ['charts_loaded', 'matplotlib_loaded']:
+        summary[key] = any(r[key] for r in results)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='起動の計測回数（中央値を表示）')
+    parser.add_argument('--reruns', type=int, default=5, help='1プロセスあたりの再実行回数')
+    parser.add_argument('--max-first-render', type=float, help='ブラウザ描画の初回表示の上限（秒）')
+    parser.add_argument('--child', choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.reruns)
+        return 0
+
+    status = 0
+    print(f"{'backend':>8} {'import s':>9} {'first render s':>15} {'rerun ms':>9} {'charts':>7} {'matplotlib':>11}")
+    for backend in BACKENDS:
+        r = measure(backend, args.runs, args.reruns)
+        print(f"{backend:>8} {r['import']:9.2f} {r['first_render']:15.2f} {r['rerun'] * 1000:9.0f} "
+              f"{'loaded' if r['charts_loaded'] else '-':>7} {'loaded' if r['matplotlib_loaded'] else '-':>11}")
+        if backend == 'vega':
+            if r['charts_loaded'] or r['matplotlib_loaded']:
+                print("regression: ブラウザ描画で matplotlib が読み込まれています", file=sys.stderr)
+                status = 1
+            if args.max_first_render is not None and r['first_render'] > args.max_first_render:
+                print(f"regression: 初回表示 {r['first_render']:.2f}s > {args.max_first_render:.2f}s", file=sys.stderr)
+                status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
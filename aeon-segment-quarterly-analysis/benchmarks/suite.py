@@ -0,0 +1,240 @@
+"""ダッシュボード全体のベンチマークスイート（合成データのスケール別、ベースラインとの比較付き）
+
+セグメント数 × 四半期数の合成データごとに、次の処理時間を計測する。
+- load.*:    CSVの読み込み・正規化、スナップショットの読み込み、キューブの構築
+- quarters.*: 四半期ラベルの並べ替え（sort_quarter_key）・解析
+- agg.*:     各ビューの集計（クロス集計・構成比・利益率・成長率・セグメント詳細）
+- chart.*:   matplotlib での各チャートの描画（PNG）、vega.* は Vega-Lite 仕様の生成
+- report.*:  HTMLレポートの出力（get_html_report、PNG / SVG）
+- app.*:     AppTest でアプリを実行した再実行ごとの時間（ビュー別・タブ表示）
+
+結果は benchmarks/results/latest.json に保存し、ベースラインより遅くなった項目を表示して終了コード1を返す。
+
+    python benchmarks/suite.py --save-baseline        # ベースラインを保存
+    python benchmarks/suite.py                        # 計測してベースラインと比較
+    python benchmarks/suite.py --quick                # 小さいスケールだけ
+    python benchmarks/suite.py --segments 9 500 --quarters 32 400 --only agg app
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analysis  # noqa: E402
+import charts  # noqa: E402
+import data_loader  # noqa: E402
+import reports  # noqa: E402
+import snapshot  # noqa: E402
+import synthetic  # noqa: E402
+import vega_charts  # noqa: E402
+from cube import SegmentCube  # noqa: E402
+from metrics import GrowthMetrics  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+LATEST_PATH = os.path.join(RESULTS_DIR, 'latest.json')
+APP = os.path.join(ROOT, 'app.py')
+
+SEGMENTS = [9, 100, 500]
+QUARTERS = [32, 100, 400]
+QUICK = [(9, 32), (100, 100)]
+# 1回の計測がこれより長ければ繰り返さない（描画の重いケースの所要時間を抑える）
+SLOW_CASE_SECONDS = 1.0
+
+
+def measure(func, repeat):
+    """実行時間（ms）の最小値・中央値"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+        if times[-1] > SLOW_CASE_SECONDS * 1000:
+            break
+    return {'min_ms': round(min(times), 3), 'median_ms': round(statistics.median(times), 3), 'runs': len(times)}
+
+
+def data_cases(csv_path):
+    """読み込み・集計・描画のケース（名前 -> 引数なしの関数）"""
+    df = data_loader.load_segment_frame(csv_path)
+    snapshot.write_snapshot(csv_path, snapshot.encode_categories(df.copy()))
+    cube = SegmentCube.from_frame(df)
+    view = cube.period(cube.quarters[0], cube.quarters[-1])
+    segments = view.segments_present()
+    segment = segments[0]
+    labels = df['決算年度'].astype(str).tolist()
+    shuffled = random.Random(0).sample(labels, len(labels))
+
+    def composition():
+        for metric in ['営業収益構成比', '営業利益構成比']:
+            view.frame(metric, segments)
+            analysis.sort_by_last_quarter(view.table(metric, segments))
+
+    def growth():
+        metrics = GrowthMetrics(view)
+        index = metrics.base_index(analysis.growth_segments(segments))
+        analysis.sort_by_last_quarter(index)
+        metrics.summary(index.index)
+
+    def detail():
+        seg_detail = analysis.segment_detail(view, segment, GrowthMetrics(view))
+        analysis.detail_table(seg_detail)
+        analysis.composition_table(seg_detail)
+
+    cases = {
+        'load.csv': lambda: data_loader.load_segment_frame(csv_path),
+        'load.snapshot': lambda: snapshot.read_snapshot(csv_path),
+        'load.cube': lambda: SegmentCube.from_frame(df),
+        'quarters.sort_key': lambda: sorted(shuffled, key=analysis.sort_quarter_key),
+        'quarters.parse': lambda: data_loader.parse_quarter_labels(df['決算年度']),
+        'agg.overview': lambda: (view.table('営業収益', segments), view.table('営業利益', segments)),
+        'agg.composition': composition,
+        'agg.margin': lambda: (view.frame('営業利益率', segments),
+                               analysis.sort_by_last_quarter(view.table('営業利益率', segments))),
+        'agg.growth': growth,
+        'agg.detail': detail,
+    }
+    render_cases = {}
+    for chart_id in reports.REPORTS:
+        render_cases[f'chart.{chart_id}'] = lambda c=chart_id: reports.build_chart_png(view, c, segment)
+        cases[f'vega.{chart_id}'] = lambda c=chart_id: json.dumps(vega_charts.build_spec(view, c, segment))
+    table = view.table('営業収益', segments)
+    for fmt in reports.REPORT_FORMATS:
+        render_cases[f'report.{fmt}'] = lambda f=fmt: reports.get_html_report(
+            table, 'benchmark', reports.build_chart(view, 'revenue'), f)
+    return cases, render_cases
+
+
+def app_cases(data_dir, repeat):
+    """AppTest でアプリを実行し、ビュー別・タブ表示の再実行時間を計測"""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['SEGMENT_DATA_DIR'] = data_dir
+    os.environ['CHART_BACKEND'] = 'vega'
+    results = {}
+    at = AppTest.from_file(APP, default_timeout=900)
+    start = time.perf_counter()
+    at.run()
+    results['app.first_run'] = {'min_ms': round((time.perf_counter() - start) * 1000, 3), 'runs': 1}
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    def radio(label):
+        return next(r for r in at.radio if r.label == label)
+
+    for option in radio("表示するビュー").options:
+        radio("表示するビュー").set_value(option)
+        at.run()
+        results[f"app.view.{option.split(' ', 1)[1]}"] = measure(at.run, repeat)
+    mode = radio("🖥️ 表示モード")
+    mode.set_value(mode.options[1])
+    at.run()
+    results['app.tabs'] = measure(at.run, repeat)
+    return results
+
+
+def run_scale(n_segments, n_quarters, args):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        csv_path = os.path.join(data_dir, 'synthetic.csv')
+        synthetic.write_csv(csv_path, n_segments, n_quarters)
+        cases, render_cases = data_cases(csv_path)
+        if n_segments * n_quarters <= args.max_render_cells:
+            cases.update(render_cases)
+        for name, func in cases.items():
+            if selected(name, args.only):
+                results[name] = measure(func, args.repeat)
+        if selected('app', args.only) and n_segments * n_quarters <= args.max_app_cells:
+            results.update(app_cases(data_dir, args.repeat))
+    return results
+
+
+def selected(name, only):
+    return not only or name.split('.')[0] in only
+
+
+def compare(results, baseline, tolerance, noise_ms):
+    """ベースラインより遅くなった項目 [(スケール, ケース, 今回ms, 基準ms)]"""
+    regressions = []
+    for scale, cases in results.items():
+        for name, r in cases.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+            if r['min_ms'] > base['min_ms'] * (1 + tolerance) and r['min_ms'] - base['min_ms'] > noise_ms:
+                regressions.append((scale, name, r['min_ms'], base['min_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, nargs='+', default=SEGMENTS)
+    parser.add_argument('--quarters', type=int, nargs='+', default=QUARTERS)
+    parser.add_argument('--quick', action='store_true', help=f'小さいスケールのみ {QUICK}')
+    parser.add_argument('--only', nargs='+', choices=['load', 'quarters', 'agg', 'chart', 'vega', 'report', 'app'],
+                        help='計測するグループ')
+    parser.add_argument('--repeat', type=int, default=5, help='各ケースの繰り返し回数（最小値で比較）')
+    parser.add_argument('--max-render-cells', type=int, default=5_000,
+                        help='matplotlib 描画を計測するセグメント×四半期数の上限')
+    parser.add_argument('--max-app-cells', type=int, default=50_000, help='AppTest を実行するセグメント×四半期数の上限')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='結果をベースラインとして保存')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='遅くなったとみなす割合（既定: 25%%）')
+    parser.add_argument('--noise-ms', type=float, default=2.0, help='これ未満の差は無視する（ms）')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    charts.setup_matplotlib()
+    scales = QUICK if args.quick else [(s, q) for s in args.segments for q in args.quarters]
+    results = {}
+    for n_segments, n_quarters in scales:
+        scale = f"s{n_segments}_q{n_quarters}"
+        start = time.perf_counter()
+        results[scale] = run_scale(n_segments, n_quarters, args)
+        print(f"{scale}: {len(results[scale])} cases in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(LATEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(f"{'scale':>12} {'case':<28} {'min ms':>10} {'baseline':>10} {'change':>8}")
+    for scale, cases in results.items():
+        for name, r in cases.items():
+            base = baseline.get(scale, {}).get(name)
+            change = f"{(r['min_ms'] / base['min_ms'] - 1) * 100:+7.0f}%" if base and base['min_ms'] else ''
+            base_ms = f"{base['min_ms']:10.2f}" if base else f"{'-':>10}"
+            print(f"{scale:>12} {name:<28} {r['min_ms']:10.2f} {base_ms} {change:>8}")
+
+    if args.save_baseline:
+        # 既存のベースラインに今回計測したスケールを上書きで追加する
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                saved = json.load(f)
+        saved.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, ensure_ascii=False, indent=1)
+        print(f"baseline saved: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.noise_ms)
+    for scale, name, now, base in regressions:
+        print(f"regression: {scale} {name}: {base:.2f} ms -> {now:.2f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
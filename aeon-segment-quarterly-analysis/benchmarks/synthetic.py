@@ -0,0 +1,43 @@
+"""ベンチマーク用の合成データセット（セグメント数 × 四半期数を指定、実データと同じ列構成・cp932・桁区切り付き）"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def quarter_labels(n_quarters, last_year=2025):
+    """直近 n 四半期の決算年度ラベル（古い順）"""
+    n_years = -(-n_quarters // 4)
+    labels = [(f"FY{y}-{q}Q", f"Q{q}") for y in range(last_year - n_years + 1, last_year + 1) for q in range(1, 5)]
+    return labels[-n_quarters:]
+
+
+def make_frame(n_segments, n_quarters, seed=0):
+    """CSVと同じ列構成の合成データ（営業収益はランダムウォーク、一部のセグメントは赤字）"""
+    rng = np.random.default_rng(seed)
+    labels = quarter_labels(n_quarters)
+    revenue = rng.uniform(1e4, 1e6, n_segments)[:, None] * np.cumprod(
+        rng.normal(1.01, 0.05, (n_segments, n_quarters)), axis=1)
+    margin = rng.normal(3, 4, (n_segments, 1)) + rng.normal(0, 1, (n_segments, n_quarters))
+    profit = revenue * margin / 100
+    return pd.DataFrame({
+        'セグメント': np.repeat([f"セグメント{i:03d}" for i in range(n_segments)], n_quarters),
+        '決算年度': np.tile([label for label, _ in labels], n_segments),
+        '決算種別': np.tile([kind for _, kind in labels], n_segments),
+        '営業収益': np.round(revenue).ravel(),
+        '営業利益': np.round(profit).ravel(),
+        '営業利益率': np.round(margin, 1).ravel(),
+        '営業収益構成比': np.round(revenue / revenue.sum(axis=0) * 100, 1).ravel(),
+        '営業利益構成比': np.round(profit / np.abs(profit).sum(axis=0) * 100, 1).ravel(),
+        '設備投資': np.nan,
+    })
+
+
+def write_csv(path, n_segments, n_quarters, seed=0):
+    """合成データをCSVに書き出す（金額は実データと同じ "1,234 " 形式）"""
+    df = make_frame(n_segments, n_quarters, seed)
+    for col in ['営業収益', '営業利益']:
+        df[col] = df[col].map(lambda v: f"{v:,.0f} ")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path, index=False, encoding='cp932', lineterminator='\r\n')
+    return len(df)
@@ -0,0 +1,208 @@
+"""チャート描画（Streamlit非依存・pyplotのグローバル状態を使わないFigure API）
+
+matplotlib の読み込みには時間がかかるため、画像表示・HTMLレポートを使うときだけ読み込む
+（reports.py から遅延インポートされる）。
+"""
+import io
+import os
+
+import matplotlib
+import matplotlib.font_manager as fm
+from matplotlib.figure import Figure
+
+import diagnostics
+from palette import segment_color
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "ipaexg.ttf")
+
+# seaborn の whitegrid テーマ（notebook コンテキスト・deep パレット）と同じ見た目にする rcParams
+THEME = {
+    'axes.axisbelow': True,
+    'axes.edgecolor': '.8',
+    'axes.grid': True,
+    'axes.labelcolor': '.15',
+    'axes.labelsize': 12.0,
+    'axes.linewidth': 1.25,
+    'axes.prop_cycle': matplotlib.cycler(color=[
+        '#4c72b0', '#dd8452', '#55a868', '#c44e52', '#8172b3', '#937860', '#da8bc3', '#8c8c8c', '#ccb974', '#64b5cd',
+    ]),
+    'axes.titlesize': 12.0,
+    'font.size': 12.0,
+    'grid.color': '.8',
+    'grid.linewidth': 1.0,
+    'legend.fontsize': 11.0,
+    'legend.title_fontsize': 12.0,
+    'lines.solid_capstyle': 'round',
+    'patch.edgecolor': 'w',
+    'patch.force_edgecolor': True,
+    'text.color': '.15',
+    'xtick.bottom': False,
+    'xtick.color': '.15',
+    'xtick.labelsize': 11.0,
+    'xtick.major.size': 6.0,
+    'xtick.major.width': 1.25,
+    'xtick.minor.size': 4.0,
+    'xtick.minor.width': 1.0,
+    'ytick.color': '.15',
+    'ytick.labelsize': 11.0,
+    'ytick.left': False,
+    'ytick.major.size': 6.0,
+    'ytick.major.width': 1.25,
+    'ytick.minor.size': 4.0,
+    'ytick.minor.width': 1.0,
+}
+
+# 設定済みのフォント名（フォント登録・テーマ設定はプロセスごとに1回だけ行う）
+_font_name = None
+
+
+# --- 日本語フォント設定 (ローカル & Cloud 両対応) ---
+def setup_font():
+    """fontsフォルダからフォントを読み込み、日本語表示を有効化"""
+    if os.path.exists(FONT_PATH):
+        fm.fontManager.addfont(FONT_PATH)
+        prop = fm.FontProperties(fname=FONT_PATH)
+        matplotlib.rcParams['font.family'] = prop.get_name()
+        return prop.get_name()
+    else:
+        # フォールバック: システムフォントを試行
+        matplotlib.rcParams['font.family'] = ['Meiryo', 'MS Gothic', 'Hiragino Sans', 'sans-serif']
+        return 'sans-serif'
+
+
+def setup_matplotlib():
+    """フォント・テーマを設定（何度呼んでも設定はプロセス内で最初の1回だけ）"""
+    global _font_name
+    if _font_name is None:
+        matplotlib.rcParams.update(THEME)
+        matplotlib.rcParams['axes.unicode_minus'] = False  # マイナス記号の文字化け対策
+        _font_name = setup_font()
+    return _font_name
+
+
+def figure_to_bytes(fig, fmt='png', dpi=150):
+    """Figureを画像のバイト列に変換"""
+    buf = io.BytesIO()
+    with diagnostics.span(f'figure.encode.{fmt}'):
+        fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight', facecolor='white')
+    data = buf.getvalue()
+    diagnostics.add_bytes(f'figure.{fmt}', len(data))
+    return data
+
+
+def _tight_layout(fig):
+    with diagnostics.span('figure.tight_layout'):
+        fig.tight_layout()
+
+
+def stacked_bar_chart(pivot, palette, title, ylabel, zero_line=False):
+    """セグメント別の積み上げ棒グラフ（営業収益・営業利益）"""
+    fig = Figure(figsize=(14, 6))
+    ax = fig.subplots()
+    pivot.plot(kind='bar', stacked=True, ax=ax,
+               color=[segment_color(palette, s) for s in pivot.columns])
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel('決算四半期')
+    ax.set_ylabel(ylabel)
+    if zero_line:
+        ax.axhline(y=0, color='black', linewidth=0.5)
+    ax.legend(title='セグメント', bbox_to_anchor=(1.02, 1), loc='upper left')
+    ax.tick_params(axis='x', rotation=45)
+    _tight_layout(fig)
+    return fig
+
+
+def _plot_segment_lines(ax, frame, palette, **kwargs):
+    """セグメント × 四半期の表から、セグメントごとの折れ線を描画"""
+    quarters = frame.columns.tolist()
+    for segment, row in frame.iterrows():
+        ax.plot(quarters, row.to_numpy(),
+                marker='o', label=segment, color=segment_color(palette, segment), **kwargs)
+
+
+def composition_chart(frame, palette, title, zero_line=False):
+    """構成比の推移（折れ線）"""
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    _plot_segment_lines(ax, frame, palette)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel('決算四半期')
+    ax.set_ylabel('構成比（%）')
+    if zero_line:
+        ax.axhline(y=0, color='black', linewidth=0.5)
+    ax.legend(bbox_to_anchor=(1.02, 1), loc='upper left', fontsize=8)
+    ax.tick_params(axis='x', rotation=45)
+    _tight_layout(fig)
+    return fig
+
+
+def margin_chart(frame, palette):
+    """営業利益率の推移（折れ線）"""
+    fig = Figure(figsize=(14, 7))
+    ax = fig.subplots()
+    _plot_segment_lines(ax, frame, palette, linewidth=2)
+    ax.set_title('セグメント別営業利益率の推移', fontsize=14, fontweight='bold')
+    ax.set_xlabel('決算四半期')
+    ax.set_ylabel('営業利益率（%）')
+    ax.axhline(y=0, color='black', linewidth=0.5)
+    ax.legend(bbox_to_anchor=(1.02, 1), loc='upper left')
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3)
+    _tight_layout(fig)
+    return fig
+
+
+def growth_chart(growth, palette, start_q):
+    """start_q基準の営業収益成長率（折れ線）"""
+    fig = Figure(figsize=(14, 7))
+    ax = fig.subplots()
+    _plot_segment_lines(ax, growth, palette, linewidth=2)
+    ax.set_title(f'セグメント別営業収益成長率（{start_q}=1.00）', fontsize=14, fontweight='bold')
+    ax.set_xlabel('決算四半期')
+    ax.set_ylabel('成長率（倍）')
+    ax.axhline(y=1.0, color='black', linewidth=0.5, linestyle='--')
+    ax.legend(bbox_to_anchor=(1.02, 1), loc='upper left')
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3)
+    _tight_layout(fig)
+    return fig
+
+
+def segment_detail_chart(seg_detail, start_q):
+    """セグメント詳細の2x2サブプロット"""
+    quarters_display = seg_detail['決算年度'].tolist()
+    fig = Figure(figsize=(14, 10))
+    axs = fig.subplots(2, 2)
+
+    # 営業収益
+    axs[0, 0].bar(quarters_display, seg_detail['営業収益'], color='skyblue')
+    axs[0, 0].set_title('営業収益', fontsize=12, fontweight='bold')
+    axs[0, 0].set_ylabel('金額（百万円）')
+    axs[0, 0].tick_params(axis='x', rotation=90)
+
+    # 営業利益
+    colors = ['orange' if v >= 0 else 'red' for v in seg_detail['営業利益']]
+    axs[0, 1].bar(quarters_display, seg_detail['営業利益'], color=colors)
+    axs[0, 1].set_title('営業利益', fontsize=12, fontweight='bold')
+    axs[0, 1].set_ylabel('金額（百万円）')
+    axs[0, 1].axhline(y=0, color='black', linewidth=0.5)
+    axs[0, 1].tick_params(axis='x', rotation=90)
+
+    # 営業収益成長率
+    axs[1, 0].plot(quarters_display, seg_detail['営業収益成長率'], marker='o', color='green', linewidth=2)
+    axs[1, 0].set_title(f'営業収益成長率（{start_q}=1.00）', fontsize=12, fontweight='bold')
+    axs[1, 0].set_ylabel('成長率（倍）')
+    axs[1, 0].axhline(y=1.0, color='black', linewidth=0.5, linestyle='--')
+    axs[1, 0].tick_params(axis='x', rotation=90)
+    axs[1, 0].grid(True, alpha=0.3)
+
+    # 営業利益率
+    axs[1, 1].plot(quarters_display, seg_detail['営業利益率'], marker='o', color='purple', linewidth=2)
+    axs[1, 1].set_title('営業利益率', fontsize=12, fontweight='bold')
+    axs[1, 1].set_ylabel('利益率（%）')
+    axs[1, 1].axhline(y=0, color='black', linewidth=0.5)
+    axs[1, 1].tick_params(axis='x', rotation=90)
+    axs[1, 1].grid(True, alpha=0.3)
+
+    _tight_layout(fig)
+    return fig
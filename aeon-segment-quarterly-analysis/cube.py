@@ -0,0 +1,209 @@
+"""セグメント × 四半期 × 指標の分析キューブ（データ読み込み時に一度だけ構築）"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import diagnostics
+from metrics import GrowthMetrics
+
+# キューブに格納する指標
+METRICS = ['営業収益', '営業利益', '営業利益率', '営業収益構成比', '営業利益構成比', '設備投資']
+# キューブごとに保持する期間ビューの数（再実行のたびに同じ期間のビュー・内容ハッシュを作り直さない）
+PERIOD_CACHE_SIZE = 32
+
+
+class SegmentCube:
+    """密なNumPy配列（セグメント × 四半期 × 指標）とインデックスの組
+
+    values は欠損をNaNとした値、present は元データに行が存在するかどうか。
+    四半期軸は通し番号（ordinals）の昇順で、期間選択は四半期軸のスライス（ビュー）なので
+    コピーも再集計も発生しない。期間ビューは直近 PERIOD_CACHE_SIZE 件を元キューブに保持する。
+    """
+
+    def __init__(self, values, present, segments, quarters, ordinals, metrics, version=None):
+        self.values = values
+        self.present = present
+        self.segments = segments
+        self.quarters = quarters
+        self.ordinals = ordinals
+        self.metrics = metrics
+        if version is not None:
+            self.__dict__['version'] = version
+        self._periods = OrderedDict()
+        self._periods_lock = threading.Lock()
+
+    def __getstate__(self):
+        # ワーカープロセスへ渡すときは期間ビューのキャッシュ（ロックを含む）を除く
+        state = self.__dict__.copy()
+        del state['_periods'], state['_periods_lock']
+        # 成長指標は受け取った側で必要になったときに計算し直す
+        state.pop('growth', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._periods = OrderedDict()
+        self._periods_lock = threading.Lock()
+
+    @cached_property
+    def version(self):
+        """内容ハッシュ（描画キャッシュ等のキーに使う）
+
+        期間ビューではその期間の四半期ごとのハッシュだけから求めるので、四半期を追加しても
+        追加した四半期を含まない期間のチャート・レポートはキャッシュがそのまま使える。
+        """
+        h = hashlib.sha1()
+        for digest in self.quarter_digests:
+            h.update(digest)
+        h.update('\x1f'.join(self.segments + self.metrics).encode('utf-8'))
+        return h.hexdigest()[:16]
+
+    @cached_property
+    def growth(self):
+        """営業収益の成長指標（metrics.GrowthMetrics、ビューごとに一度だけ計算して表・チャート・レポートで共有する）"""
+        return GrowthMetrics(self)
+
+    @cached_property
+    def quarter_digests(self):
+        """四半期ごとの内容ハッシュ（期間ビューは元キューブで一度だけ求めたものを共有する）"""
+        digests = []
+        for i, quarter in enumerate(self.quarters):
+            h = hashlib.sha1(quarter.encode('utf-8'))
+            h.update(np.ascontiguousarray(self.values[:, i]).tobytes())
+            h.update(np.ascontiguousarray(self.present[:, i]).tobytes())
+            digests.append(h.digest())
+        return digests
+
+    @classmethod
+    def from_frame(cls, df, metrics=METRICS):
+        """正規化済みの縦持ちデータからキューブを構築
+
+        セグメントはカテゴリのコード、四半期は通し番号（四半期番号列、なければラベルから求める）で
+        配列上の位置を求め、文字列の比較・グループ化は行わない。
+        """
+        metrics = [m for m in metrics if m in df.columns]
+        if df['セグメント'].isna().any():
+            df = df[df['セグメント'].notna()]
+        segment_col = df['セグメント']
+        if segment_col.dtype != 'category':
+            segment_col = segment_col.astype('category')
+        categories = segment_col.cat.categories
+        codes = segment_col.cat.codes.to_numpy()
+        used = np.zeros(len(categories), dtype=bool)
+        used[codes] = True
+        segments = sorted(categories[used].tolist())
+        # カテゴリのコード -> ソート済みセグメントの位置
+        seg_idx = pd.Index(segments).get_indexer(categories)[codes]
+
+        if '四半期番号' in df.columns:
+            ordinals = df['四半期番号'].to_numpy()
+        else:
+            ordinals = data_loader.quarter_ordinals(df['決算年度'])
+        quarter_ordinals, q_idx = np.unique(ordinals, return_inverse=True)
+        quarters = [data_loader.quarter_label(int(o)) for o in quarter_ordinals]
+
+        # 同一セグメント・四半期の重複行は合計（pivot_table / crosstab の aggfunc='sum' と同じく、
+        # 全て欠損ならNaN）
+        n_cells = len(segments) * len(quarters)
+        cell = seg_idx * len(quarters) + q_idx
+        data = df[metrics].to_numpy(dtype=float)
+        valid = ~np.isnan(data)
+        values = np.empty((n_cells, len(metrics)))
+        for m in range(len(metrics)):
+            sums = np.bincount(cell, weights=np.where(valid[:, m], data[:, m], 0.0), minlength=n_cells)
+            counts = np.bincount(cell, weights=valid[:, m], minlength=n_cells)
+            values[:, m] = np.where(counts > 0, sums, np.nan)
+        present = np.bincount(cell, minlength=n_cells) > 0
+        return cls(values.reshape(len(segments), len(quarters), len(metrics)),
+                   present.reshape(len(segments), len(quarters)),
+                   segments, quarters, quarter_ordinals, metrics)
+
+    @property
+    def nbytes(self):
+        """配列とラベルのおおよそのメモリ使用量"""
+        labels = sum(len(x.encode('utf-8')) + 64 for x in self.segments + self.quarters + self.metrics)
+        return self.values.nbytes + self.present.nbytes + self.ordinals.nbytes + labels
+
+    @cached_property
+    def segment_index(self):
+        return {s: i for i, s in enumerate(self.segments)}
+
+    @cached_property
+    def quarter_index(self):
+        return {q: i for i, q in enumerate(self.quarters)}
+
+    @cached_property
+    def metric_index(self):
+        return {m: i for i, m in enumerate(self.metrics)}
+
+    def period(self, start_q, end_q):
+        """開始〜終了四半期のビュー（配列スライスのみ、同じ期間なら同じビューを返す）"""
+        key = (start_q, end_q)
+        with self._periods_lock:
+            cube = self._periods.get(key)
+            if cube is not None:
+                self._periods.move_to_end(key)
+                return cube
+        cube = self._slice(start_q, end_q)
+        with self._periods_lock:
+            cube = self._periods.setdefault(key, cube)
+            while len(self._periods) > PERIOD_CACHE_SIZE:
+                self._periods.popitem(last=False)
+        return cube
+
+    def _slice(self, start_q, end_q):
+        start_idx = self.quarter_index[start_q]
+        end_idx = self.quarter_index[end_q]
+        cube = SegmentCube(
+            self.values[:, start_idx:end_idx+1],
+            self.present[:, start_idx:end_idx+1],
+            self.segments,
+            self.quarters[start_idx:end_idx+1],
+            self.ordinals[start_idx:end_idx+1],
+            self.metrics,
+        )
+        # セグメント・指標のインデックスと四半期ごとの内容ハッシュは元キューブと共有
+        cube.__dict__['segment_index'] = self.segment_index
+        cube.__dict__['metric_index'] = self.metric_index
+        cube.__dict__['quarter_digests'] = self.quarter_digests[start_idx:end_idx+1]
+        return cube
+
+    def segments_present(self):
+        """この期間にデータが存在するセグメント"""
+        return [s for s, has in zip(self.segments, self.present.any(axis=1)) if has]
+
+    def _rows(self, segments):
+        if segments is None:
+            return self.segments, slice(None)
+        return segments, [self.segment_index[s] for s in segments]
+
+    def frame(self, metric, segments=None):
+        """セグメント × 四半期の値（欠損はNaNのまま、折れ線グラフ用）"""
+        with diagnostics.span('cube.frame'):
+            segments, rows = self._rows(segments)
+            data = self.values[rows, :, self.metric_index[metric]]
+            return pd.DataFrame(data, index=pd.Index(segments, name='セグメント'),
+                                columns=pd.Index(self.quarters, name='決算年度'))
+
+    def table(self, metric, segments=None):
+        """セグメント × 四半期の集計表（crosstab の aggfunc='sum' と同じく、行があれば欠損値は0）"""
+        with diagnostics.span('cube.table'):
+            segments, rows = self._rows(segments)
+            data = self.values[rows, :, self.metric_index[metric]]
+            present = self.present[rows]
+            data = np.where(present, np.nan_to_num(data), np.nan)
+            return pd.DataFrame(data, index=pd.Index(segments, name='セグメント'),
+                                columns=pd.Index(self.quarters, name='決算年度'))
+
+    def segment_frame(self, segment):
+        """1セグメントの縦持ちデータ（データが存在する四半期のみ、時系列順）"""
+        row = self.segment_index[segment]
+        mask = self.present[row]
+        df = pd.DataFrame(self.values[row][mask], columns=self.metrics)
+        df.insert(0, '決算年度', [q for q, has in zip(self.quarters, mask) if has])
+        return df
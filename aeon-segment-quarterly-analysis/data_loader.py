@@ -0,0 +1,116 @@
+"""セグメントCSVの読み込み・正規化（Streamlit非依存）"""
+import codecs
+
+import numpy as np
+import pandas as pd
+
+# CSVの列定義（数値列は桁区切りカンマ付きの文字列でも直接floatとして読む）
+NUMERIC_COLUMNS = ['営業収益', '営業利益', '営業利益率', '営業収益構成比', '営業利益構成比', '設備投資']
+CSV_DTYPES = {
+    'セグメント': str,
+    '決算年度': str,
+    '決算種別': str,
+    **{col: 'float64' for col in NUMERIC_COLUMNS},
+}
+# 欠損を0とみなす金額列
+AMOUNT_COLUMNS = ['営業収益', '営業利益', '設備投資']
+QUARTER_TYPES = ['Q1', 'Q2', 'Q3', 'Q4']
+QUARTER_PATTERN = r'^FY(\d{4})(?:-([1-4])Q)?$'
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+
+def detect_encoding(path, sample_size=ENCODING_SAMPLE_BYTES):
+    """先頭のバイト列からエンコーディングを判定（BOM付きUTF-8 / UTF-8 / cp932）"""
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # サンプル末尾で切れたマルチバイト文字はエラーにしない
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp932'
+
+
+def parse_quarter_labels(labels):
+    """決算年度ラベル（FY2023-3Q / FY2023）を年度・四半期の整数列に変換（年度ラベルの四半期は0）
+
+    ユニークなラベルだけを正規表現で解析し、コード配列で展開する。
+    解析できない・欠損したラベルがあれば ValueError。
+    """
+    codes, uniques = pd.factorize(labels)
+    parts = pd.Series(uniques, dtype=object).str.extract(QUARTER_PATTERN)
+    invalid = parts[0].isna()
+    if invalid.any() or (codes < 0).any():
+        bad = pd.Series(uniques, dtype=object)[invalid].tolist()[:5]
+        raise ValueError(f"決算年度のラベルが不正です: {bad if bad else '欠損'}（FY2023-3Q / FY2023 の形式）")
+    years = parts[0].astype('int32').to_numpy()
+    quarters = parts[1].fillna(0).astype('int32').to_numpy()
+    return years[codes], quarters[codes]
+
+
+def quarter_ordinals(labels):
+    """四半期ラベルを通し番号に変換（FY2023-1Q → 2023*4+0、連続する四半期は連番）
+
+    年度ラベル（FY2023）は四半期の並びに含められないため ValueError。
+    """
+    years, quarters = parse_quarter_labels(labels)
+    if (quarters == 0).any():
+        raise ValueError("四半期の通し番号に年度ラベル（FY2023 の形式）は使えません")
+    return years * 4 + (quarters - 1)
+
+
+def quarter_label(ordinal):
+    """通し番号から四半期ラベルに戻す（2023*4+0 → FY2023-1Q）"""
+    return f"FY{ordinal // 4}-{ordinal % 4 + 1}Q"
+
+
+def _read_csv(path, encoding):
+    try:
+        return pd.read_csv(path, encoding=encoding, dtype=CSV_DTYPES, thousands=',')
+    except UnicodeDecodeError:
+        # ValueError のサブクラスだが、エンコーディングの判定違いは呼び出し側で扱う
+        raise
+    except ValueError:
+        # 数値列に想定外の文字列が含まれる場合は、文字列として読んでから変換
+        df = pd.read_csv(path, encoding=encoding, dtype=str)
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col].str.replace(',', '').str.strip(), errors='coerce')
+        return df
+
+
+def read_segment_csv(path):
+    """エンコーディングを判定してCSVを1回で読み込む"""
+    encoding = detect_encoding(path)
+    try:
+        return _read_csv(path, encoding)
+    except UnicodeDecodeError:
+        # サンプル外に非UTF-8のバイト列があった場合
+        if encoding == 'cp932':
+            raise
+        return _read_csv(path, 'cp932')
+
+
+def normalize_segment_frame(df):
+    """四半期データの抽出・数値整形・四半期の通し番号の付与・時系列ソート"""
+    # 四半期データのみを抽出（Q1, Q2, Q3, Q4）
+    df = df[df['決算種別'].isin(QUARTER_TYPES)].reset_index(drop=True)
+
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna(0)
+
+    # 営業利益率を丸める
+    df['営業利益率'] = np.round(df['営業利益率'], 1)
+
+    # 四半期の通し番号（並べ替え・期間選択に使う、不正なラベルは ValueError）
+    df['四半期番号'] = quarter_ordinals(df['決算年度'])
+    return df.sort_values(['セグメント', '四半期番号'], kind='stable').reset_index(drop=True)
+
+
+def load_segment_frame(path):
+    """CSVを読み込み、正規化済みのデータフレームを返す"""
+    return normalize_segment_frame(read_segment_csv(path))
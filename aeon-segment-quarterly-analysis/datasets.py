@@ -0,0 +1,90 @@
+"""データセット（企業ごとのセグメントCSV）のレジストリ（Streamlit非依存）"""
+import os
+import threading
+from collections import OrderedDict
+
+import diagnostics
+import snapshot
+from cube import SegmentCube
+
+
+class DatasetRegistry:
+    """data/ 配下のCSVを発見し、キューブを初回アクセス時に構築してLRUで保持する
+
+    保持しているキューブの合計サイズが max_bytes を超えると、最も古く参照された
+    データセットから破棄する（直近に使ったものは上限を超えても1件は残す）。
+    CSVのサイズ・更新時刻が変わったデータセットはアクセス時に読み込み直す。
+    """
+
+    def __init__(self, data_dir, max_bytes=256 * 1024 * 1024):
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # name -> (CSVのstat, キューブ)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def names(self):
+        """登録されているデータセット名（CSVファイル名の拡張子なし、名前順）"""
+        if not os.path.isdir(self.data_dir):
+            return []
+        return sorted(
+            os.path.splitext(entry.name)[0]
+            for entry in os.scandir(self.data_dir)
+            if entry.is_file() and entry.name.lower().endswith('.csv')
+        )
+
+    def path(self, name):
+        return os.path.join(self.data_dir, f"{name}.csv")
+
+    def get(self, name):
+        """データセットのキューブ（CSVがなければ None）"""
+        path = self.path(name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                diagnostics.count('dataset_cache.hit')
+                return entry[1]
+            self.misses += 1
+            diagnostics.count('dataset_cache.miss')
+
+        # 読み込みはロック外で行う（スナップショットがあればメモリマップで読む）
+        with diagnostics.span('dataset.load'):
+            cube = SegmentCube.from_frame(snapshot.load_segment_frame(path))
+        self._put(name, signature, cube)
+        return cube
+
+    def _put(self, name, signature, cube):
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._size -= old[1].nbytes
+            self._entries[name] = (signature, cube)
+            self._size += cube.nbytes
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def evict(self, name):
+        """データセットをキャッシュから外す"""
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._size -= entry[1].nbytes
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def cached_names(self):
+        with self._lock:
+            return list(self._entries)
@@ -0,0 +1,188 @@
+"""処理時間・キャッシュ・メモリの計測（環境変数 DIAGNOSTICS で有効化、Streamlit非依存）
+
+    DIAGNOSTICS=1 streamlit run app.py        # サイドバーに診断情報を表示し、JSONログを標準エラーに出力
+    DIAGNOSTICS=memory streamlit run app.py   # tracemalloc で再実行ごとのピークメモリも計測（処理は遅くなる）
+    DIAGNOSTICS_LOG=diag.jsonl                # JSONログの出力先ファイル（1行1レコード）
+
+計測は「実行」（アプリの1回の再実行、レポートのダウンロード）単位でまとめ、
+同じ名前の区間は回数と合計時間に集計する。
+無効時は span() 等が何もしない関数に置き換わり、計測処理は一切行わない。
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODE = os.environ.get('DIAGNOSTICS', '').strip().lower()
+ENABLED = MODE not in ('', '0', 'false', 'off')
+TRACE_MEMORY = MODE == 'memory'
+
+logger = logging.getLogger('diagnostics')
+
+# 実行中の計測（Streamlit のセッションごとのスレッドで別々に持つ）
+_current = contextvars.ContextVar('diagnostics_run', default=None)
+
+
+def _peak_rss_bytes():
+    """プロセス起動以降の最大RSS（取得できなければ None）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Run:
+    """1回の実行で集計した区間の時間・カウンタ・バイト数"""
+
+    def __init__(self, kind, **fields):
+        self.kind = kind
+        self.fields = fields
+        self.spans = {}     # 区間名 -> [回数, 合計秒]（最初に現れた順）
+        self.counters = {}  # 名前 -> 回数
+        self.sizes = {}     # 名前 -> 合計バイト数
+        self.peak_rss_before = _peak_rss_bytes()
+        if TRACE_MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+
+    def add_span(self, name, seconds):
+        entry = self.spans.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def finish(self):
+        """集計結果（JSONに変換できる dict）"""
+        record = {
+            'kind': self.kind,
+            **self.fields,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'spans': {name: {'calls': calls, 'ms': round(seconds * 1000, 2)}
+                      for name, (calls, seconds) in self.spans.items()},
+            'counters': self.counters,
+            'bytes': self.sizes,
+        }
+        peak_rss = _peak_rss_bytes()
+        if peak_rss is not None:
+            record['peak_rss_mb'] = round(peak_rss / 2**20, 1)
+            record['peak_rss_growth_mb'] = round((peak_rss - self.peak_rss_before) / 2**20, 1)
+        if TRACE_MEMORY:
+            record['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        return record
+
+
+def _setup_logger():
+    path = os.environ.get('DIAGNOSTICS_LOG')
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _emit(record):
+    logger.info(json.dumps({'ts': round(time.time(), 3), **record}, ensure_ascii=False))
+
+
+class _Span:
+    __slots__ = ('run', 'name', 'start')
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run.add_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NULL = contextlib.nullcontext()
+
+
+if ENABLED:
+    _setup_logger()
+
+    def begin(kind, **fields):
+        """実行の計測を開始（前の実行が終了していなければ破棄する）"""
+        _current.set(Run(kind, **fields))
+
+    def end():
+        """実行の計測を終了し、JSONログに出力して集計結果を返す"""
+        run = _current.get()
+        if run is None:
+            return None
+        _current.set(None)
+        record = run.finish()
+        _emit(record)
+        return record
+
+    def annotate(**fields):
+        """実行の属性（データセット・期間など）を追加"""
+        run = _current.get()
+        if run is not None:
+            run.fields.update(fields)
+
+    def span(name):
+        """区間の時間を計測するコンテキストマネージャ（実行中でなければ何もしない）"""
+        run = _current.get()
+        return _NULL if run is None else _Span(run, name)
+
+    def count(name, n=1):
+        run = _current.get()
+        if run is not None:
+            run.counters[name] = run.counters.get(name, 0) + n
+
+    def add_bytes(name, size):
+        run = _current.get()
+        if run is not None:
+            run.sizes[name] = run.sizes.get(name, 0) + size
+
+    @contextlib.contextmanager
+    def run(kind, **fields):
+        """独立した実行として計測（既に実行中なら、その中の区間として計測）"""
+        if _current.get() is not None:
+            with span(kind):
+                yield
+            return
+        begin(kind, **fields)
+        try:
+            yield
+        finally:
+            end()
+
+else:
+    def begin(kind, **fields):
+        pass
+
+    def end():
+        return None
+
+    def annotate(**fields):
+        pass
+
+    def span(name):
+        return _NULL
+
+    def count(name, n=1):
+        pass
+
+    def add_bytes(name, size):
+        pass
+
+    def run(kind, **fields):
+        return _NULL
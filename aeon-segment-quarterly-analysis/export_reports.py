@@ -0,0 +1,150 @@
+"""HTMLレポートの一括出力（Streamlitを使わないバッチ処理）
+
+data/ 配下の全データセットについて、標準の分析期間ごとに全レポート
+（セグメント詳細は全セグメント分）を生成し、プロセスプールで並列に描画する。
+
+    python export_reports.py --out reports/
+    python export_reports.py --out reports/ --periods all last4 --workers 8
+    python export_reports.py --out reports/ --datasets segment_data --reports revenue detail
+    python export_reports.py --out reports/ --format svg --gzip --combined
+
+出力先: <out>/<データセット名>/<開始四半期>_<終了四半期>/<レポートファイル名>
+--combined を付けると期間ごとに総合レポート（全レポート・全セグメント詳細を1ファイル）を出力する。
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import charts
+import reports
+from datasets import DatasetRegistry
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# 標準の分析期間（直近N四半期、None は全期間）
+PERIODS = {
+    'all': None,
+    'last4': 4,
+    'last8': 8,
+    'last12': 12,
+}
+
+# ワーカープロセスごとのレジストリ（キューブはプロセス内で1回だけ読み込む）
+_registry = None
+
+
+_options = {'fmt': 'png', 'compress': False}
+
+
+def _init_worker(data_dir, fmt='png', compress=False):
+    global _registry
+    charts.setup_matplotlib()
+    _registry = DatasetRegistry(data_dir)
+    _options.update(fmt=fmt, compress=compress)
+
+
+def _render_job(job):
+    """1レポートを生成して書き出す（ワーカープロセスで実行、report_id=None は総合レポート）"""
+    dataset, start_q, end_q, report_id, segment, out_path = job
+    view = _registry.get(dataset).period(start_q, end_q)
+    if report_id is None:
+        html = reports.build_combined_report(view, view.segments_present(), _options['fmt'])
+    else:
+        html = reports.build_report(view, report_id, segment, _options['fmt'])
+    if not html:
+        return None
+    data = reports.compress_report(html) if _options['compress'] else html.encode('utf-8')
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def period_range(quarters, period):
+    """標準期間名から (開始四半期, 終了四半期) を求める"""
+    n = PERIODS[period]
+    if n is None or n >= len(quarters):
+        return quarters[0], quarters[-1]
+    return quarters[-n], quarters[-1]
+
+
+def _unique_path(path, used):
+    """置き換え後のセグメント名が重複したファイル名には連番を付ける（A/B と A_B 等）"""
+    folder, name = os.path.split(path)
+    stem, dot, ext = name.partition('.')
+    candidate, n = path, 1
+    while candidate.lower() in used:
+        n += 1
+        candidate = os.path.join(folder, f"{stem}_{n}{dot}{ext}")
+    used.add(candidate.lower())
+    return candidate
+
+
+def plan_jobs(registry, out_dir, datasets, periods, report_ids, compress=False, combined=False):
+    """出力するレポートの一覧を作る（キューブは親プロセスで1回読むだけ）"""
+    jobs = []
+    for dataset in datasets:
+        cube = registry.get(dataset)
+        if cube is None:
+            print(f"skip: データセットが見つかりません: {dataset}", file=sys.stderr)
+            continue
+        for period in periods:
+            start_q, end_q = period_range(cube.quarters, period)
+            segments = cube.period(start_q, end_q).segments_present()
+            period_dir = os.path.join(out_dir, dataset, f"{start_q}_{end_q}")
+            used = set()
+            if combined:
+                out_path = os.path.join(period_dir, reports.report_file_name(None, compress=compress))
+                jobs.append((dataset, start_q, end_q, None, None, out_path))
+            for report_id in report_ids:
+                targets = segments if report_id in reports.SEGMENT_REPORTS else [None]
+                for segment in targets:
+                    out_path = _unique_path(
+                        os.path.join(period_dir, reports.report_file_name(report_id, segment, compress)), used)
+                    jobs.append((dataset, start_q, end_q, report_id, segment, out_path))
+    return jobs
+
+
+def run(jobs, data_dir, workers, fmt='png', compress=False):
+    """ジョブを並列に実行し、(出力件数, 合計バイト数, 経過秒) を返す"""
+    # 各ワーカーに均等に配りつつ、描画の重いジョブが偏らない程度に細かく分ける
+    chunksize = max(1, len(jobs) // (workers * 4))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir, fmt, compress)) as pool:
+        sizes = [size for size in pool.map(_render_job, jobs, chunksize=chunksize) if size is not None]
+    return len(sizes), sum(sizes), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTMLレポートを一括出力')
+    parser.add_argument('--out', required=True, help='出力先フォルダ')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='CSVのフォルダ（既定: data/）')
+    parser.add_argument('--datasets', nargs='+', help='対象データセット（既定: 全て）')
+    parser.add_argument('--periods', nargs='+', choices=list(PERIODS), default=list(PERIODS),
+                        help='分析期間（既定: 全て）')
+    parser.add_argument('--reports', nargs='+', choices=list(reports.REPORTS), default=list(reports.REPORTS),
+                        help='レポート種別（既定: 全て）')
+    parser.add_argument('--format', choices=list(reports.REPORT_FORMATS), default='png',
+                        help='チャートの埋め込み形式（既定: png）')
+    parser.add_argument('--gzip', action='store_true', help='gzip圧縮した .html.gz を出力')
+    parser.add_argument('--combined', action='store_true', help='期間ごとに総合レポートも出力')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='並列プロセス数（既定: CPUコア数）')
+    args = parser.parse_args(argv)
+
+    registry = DatasetRegistry(args.data_dir)
+    datasets = args.datasets or registry.names()
+    jobs = plan_jobs(registry, args.out, datasets, args.periods, args.reports, args.gzip, args.combined)
+    if not jobs:
+        print("出力するレポートがありません。", file=sys.stderr)
+        return 1
+
+    count, total_bytes, elapsed = run(jobs, args.data_dir, args.workers, args.format, args.gzip)
+    print(f"{count} reports, {total_bytes / 1e6:.1f} MB in {elapsed:.1f} s "
+          f"({count / elapsed:.2f} reports/s, {args.workers} workers) -> {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
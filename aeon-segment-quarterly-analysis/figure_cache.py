@@ -0,0 +1,76 @@
+"""描画済みチャート（PNG/SVGバイト列）のLRUキャッシュ（Streamlit非依存）"""
+import threading
+from collections import OrderedDict
+
+import diagnostics
+
+
+class FigureCache:
+    """チャートパラメータをキーに描画結果のバイト列を保持するLRUキャッシュ
+
+    合計サイズが max_bytes を超えると、最も古く参照されたものから破棄する（文字列は文字数で数える）。
+    セッション間（スレッド間）で共有されるため、操作はロックで保護する。
+    name は診断情報のヒット/ミスの集計名。
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, name='figure_cache'):
+        self.max_bytes = max_bytes
+        self.name = name
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """キャッシュ済みのバイト列（なければ None）"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                diagnostics.count(f'{self.name}.miss')
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            diagnostics.count(f'{self.name}.hit')
+            return data
+
+    def put(self, key, data):
+        """バイト列を登録し、上限を超えた分を古い順に破棄"""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_or_render(self, key, render):
+        """キャッシュにあれば返し、なければ render() で描画して登録"""
+        data = self.get(key)
+        if data is None:
+            # 描画はロック外で行う（同じキーの同時描画は後勝ちで問題ない）
+            data = render()
+            self.put(key, data)
+        return data
+
+    def __contains__(self, key):
+        """キャッシュ済みか（ヒット/ミスの集計・参照順は変えない）"""
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,254 @@
+"""四半期データの追加取り込み（既存データを再処理せずに新しい行をマージする）
+
+新しい四半期の行（差分CSV）を検証し、元のCSVに追記したうえで、
+正規化済みスナップショットにはソート済みの位置へ挿入して書き戻す。
+アプリはCSVの更新を検知してスナップショットから読み直すだけで、全件の再読み込み・再ソートは行わない。
+
+    python ingest.py data/incoming/segment_data/FY2025-4Q.csv --dataset segment_data
+    python ingest.py                        # data/incoming/<データセット名>/*.csv をまとめて取り込む
+
+取り込んだ差分ファイルは data/incoming/<データセット名>/processed/ に移動する。
+書き込みは1プロセスから行う前提（cron 等で定期実行する）。
+"""
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import snapshot
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+INCOMING_DIR = 'incoming'
+PROCESSED_DIR = 'processed'
+ROW_TYPES = data_loader.QUARTER_TYPES + ['年度']
+
+
+def _coerce_numeric(df):
+    """数値列をfloatに変換（変換できない値があればエラー）"""
+    df = df.copy()
+    for col in data_loader.NUMERIC_COLUMNS:
+        raw = df[col]
+        if raw.dtype == object:
+            raw = raw.str.replace(',', '').str.strip().replace('', np.nan)
+        values = pd.to_numeric(raw, errors='coerce')
+        bad = values.isna() & raw.notna()
+        if bad.any():
+            raise ValueError(f"{col} に数値でない値があります: {df.loc[bad, col].tolist()[:5]}")
+        df[col] = values.astype('float64')
+    return df
+
+
+def csv_columns(csv_path):
+    """CSVのヘッダーの列名"""
+    return pd.read_csv(csv_path, encoding=data_loader.detect_encoding(csv_path), nrows=0).columns.tolist()
+
+
+def validate_rows(rows, columns=None):
+    """追加行をCSVのスキーマに照らして検証し、数値列を変換したデータフレームを返す
+
+    columns には追記先のCSVのヘッダーを渡す（スキーマにない列・足りない列があれば追記できないためエラー）。
+    """
+    if columns is not None:
+        unknown = [col for col in columns if col not in data_loader.CSV_DTYPES]
+        absent = [col for col in data_loader.CSV_DTYPES if col not in columns]
+        if unknown or absent:
+            raise ValueError(f"追記先のCSVの列がスキーマと一致しません（未対応の列: {unknown}、不足している列: {absent}）")
+    missing = [col for col in data_loader.CSV_DTYPES if col not in rows.columns]
+    if missing:
+        raise ValueError(f"列が不足しています: {missing}")
+    rows = _coerce_numeric(rows[list(data_loader.CSV_DTYPES)])
+    for col in ['セグメント', '決算年度', '決算種別']:
+        rows[col] = rows[col].astype(str).str.strip()
+        if (rows[col] == '').any() or rows[col].isin(['nan', 'None']).any():
+            raise ValueError(f"{col} が空の行があります")
+
+    bad_types = sorted(set(rows['決算種別']) - set(ROW_TYPES))
+    if bad_types:
+        raise ValueError(f"決算種別が不正です: {bad_types}（{ROW_TYPES} のいずれか）")
+
+    # 決算年度ラベルと決算種別の整合（FY2024-1Q は Q1、FY2024 は 年度）
+    parts = rows['決算年度'].str.extract(data_loader.QUARTER_PATTERN)
+    expected = ('Q' + parts[1]).where(parts[1].notna(), '年度')
+    bad = parts[0].isna() | (expected != rows['決算種別'])
+    if bad.any():
+        raise ValueError(f"決算年度と決算種別が一致しません: "
+                         f"{rows.loc[bad, ['決算年度', '決算種別']].drop_duplicates().values.tolist()[:5]}")
+
+    duplicated = rows.duplicated(['セグメント', '決算年度'], keep=False)
+    if duplicated.any():
+        raise ValueError(f"同じセグメント・決算年度の行が重複しています: "
+                         f"{rows.loc[duplicated, ['セグメント', '決算年度']].drop_duplicates().values.tolist()[:5]}")
+    return rows
+
+
+def _align_categories(base, delta):
+    """カテゴリ列を共通のカテゴリ（ソート済みの和集合）に揃えた (base, delta) を返す
+
+    既存データのカテゴリに新しい値がなければ、既存データのコードはそのまま使う。
+    """
+    base, delta = base.copy(deep=False), delta.copy(deep=False)
+    for col in snapshot.CATEGORY_COLUMNS:
+        column = base[col] if base[col].dtype == 'category' else base[col].astype('category')
+        categories = column.cat.categories
+        new = pd.Index(delta[col].unique()).difference(categories)
+        if len(new):
+            categories = categories.append(new).sort_values()
+            column = column.cat.set_categories(categories)
+        base[col] = column
+        delta[col] = pd.Categorical(delta[col], categories=categories)
+    return base, delta
+
+
+def _sort_keys(df):
+    """(セグメント, 四半期番号) の並びを表す整数キー（セグメントはソート済みカテゴリのコード）"""
+    return df['セグメント'].cat.codes.to_numpy().astype('int64') * 100_000 + df['四半期番号'].to_numpy(dtype='int64')
+
+
+def merge_sorted(base, delta, unique=False):
+    """ソート済みの正規化データに、正規化済みの追加行をソート順の位置へ挿入する
+
+    カテゴリ型に揃えてからコードの整数キーで位置を決める（既存行を文字列に戻さない）。
+    unique=True なら、既に存在するセグメント・四半期の行があれば ValueError。
+    """
+    if delta.empty:
+        return base
+    base, delta = _align_categories(base, delta)
+    delta_keys = _sort_keys(delta)
+    order = np.argsort(delta_keys, kind='stable')
+    delta, delta_keys = delta.iloc[order], delta_keys[order]
+    base_keys = _sort_keys(base)
+    is_sorted = not (np.diff(base_keys) < 0).any()
+    if unique:
+        if is_sorted:
+            exists = (np.searchsorted(base_keys, delta_keys, side='left')
+                      < np.searchsorted(base_keys, delta_keys, side='right'))
+        else:
+            exists = np.isin(delta_keys, base_keys)
+        if exists.any():
+            raise ValueError(f"既に存在する行です: "
+                             f"{delta.loc[exists, ['セグメント', '決算年度']].astype(str).values.tolist()[:5]}")
+
+    merged = pd.concat([base, delta], ignore_index=True)
+    if not is_sorted:
+        # 既存データがソートされていない場合のみ全体を並べ直す
+        return merged.sort_values(['セグメント', '四半期番号'], kind='stable').reset_index(drop=True)
+
+    # 同じキーの既存行の後ろに入れる（安定ソートと同じ順序）
+    positions = np.searchsorted(base_keys, delta_keys, side='right')
+    order = np.insert(np.arange(len(base)), positions, np.arange(len(base), len(merged)))
+    merged = merged.take(order)
+    merged.index = pd.RangeIndex(len(merged))
+    return merged
+
+
+def _csv_rows(raw, rows):
+    """CSVに追記する値（差分の元の文字列をそのまま使い、数値で渡された金額列は元ファイルと同じ桁区切りにする）
+
+    raw は検証前の追加行、rows は validate_rows の結果（同じインデックス）。
+    """
+    out = raw[list(data_loader.CSV_DTYPES)].copy()
+    for col in ['セグメント', '決算年度', '決算種別']:
+        out[col] = rows[col]
+    for col in data_loader.NUMERIC_COLUMNS:
+        if out[col].dtype != object and col in data_loader.AMOUNT_COLUMNS:
+            out[col] = rows[col].map(lambda v: '' if pd.isna(v) else f"{v:,.0f}")
+    return out
+
+
+def _append_csv(csv_path, rows, columns):
+    """元CSVの末尾に行を追記（エンコーディング・改行コード・列順 columns は元ファイルに合わせる）"""
+    encoding = data_loader.detect_encoding(csv_path)
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        f.seek(max(0, os.path.getsize(csv_path) - 2))
+        tail = f.read()
+    newline = '\r\n' if header.endswith(b'\r\n') else '\n'
+    text = rows[columns].to_csv(header=False, index=False, lineterminator=newline)
+    if tail and not tail.endswith(b'\n'):
+        text = newline + text
+    with open(csv_path, 'a', encoding=encoding.replace('-sig', ''), newline='') as f:
+        f.write(text)
+
+
+def append_rows(csv_path, rows):
+    """追加行を検証してCSVに追記し、スナップショットを差分マージで更新する
+
+    既に存在するセグメント・決算年度の行はエラー（合算による二重計上を防ぐ）。
+    マージ後の正規化済みデータフレームを返す。
+    """
+    raw = rows
+    columns = csv_columns(csv_path)
+    rows = validate_rows(rows, columns)
+    base = snapshot.load_segment_frame(csv_path)
+    merged = merge_sorted(base, data_loader.normalize_segment_frame(rows), unique=True)
+    # CSVを先に更新する（スナップショットの書き込みに失敗しても、次回はCSVから作り直される）
+    _append_csv(csv_path, _csv_rows(raw, rows), columns)
+    try:
+        snapshot.write_snapshot(csv_path, merged)
+    except OSError:
+        pass
+    return merged
+
+
+def pending_files(data_dir, dataset):
+    """ドロップフォルダ内の未処理の差分CSV（ファイル名順）"""
+    folder = os.path.join(data_dir, INCOMING_DIR, dataset)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        entry.path for entry in os.scandir(folder)
+        if entry.is_file() and entry.name.lower().endswith('.csv')
+    )
+
+
+def ingest_file(csv_path, delta_path):
+    """差分CSVを1つ取り込み、(追加した行数, マージ後の四半期データの行数) を返す"""
+    rows = pd.read_csv(delta_path, encoding=data_loader.detect_encoding(delta_path), dtype=str)
+    merged = append_rows(csv_path, rows)
+    return len(rows), len(merged)
+
+
+def _mark_processed(delta_path):
+    processed = os.path.join(os.path.dirname(delta_path), PROCESSED_DIR)
+    os.makedirs(processed, exist_ok=True)
+    shutil.move(delta_path, os.path.join(processed, os.path.basename(delta_path)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='四半期データの差分CSVを取り込む')
+    parser.add_argument('files', nargs='*', help='差分CSV（省略時は data/incoming/<データセット名>/ 内のすべて）')
+    parser.add_argument('--dataset', default='segment_data', help='取り込み先のデータセット（ファイル指定時）')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='CSVのフォルダ（既定: data/）')
+    args = parser.parse_args(argv)
+
+    if args.files:
+        targets = [(args.dataset, path, False) for path in args.files]
+    else:
+        datasets = sorted(os.path.splitext(name)[0] for name in os.listdir(args.data_dir)
+                          if name.lower().endswith('.csv'))
+        targets = [(dataset, path, True) for dataset in datasets for path in pending_files(args.data_dir, dataset)]
+    if not targets:
+        print("取り込む差分ファイルはありません。")
+        return 0
+
+    status = 0
+    for dataset, delta_path, from_drop_folder in targets:
+        csv_path = os.path.join(args.data_dir, f"{dataset}.csv")
+        try:
+            added, total = ingest_file(csv_path, delta_path)
+        except (OSError, ValueError) as e:
+            print(f"error: {delta_path}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        if from_drop_folder:
+            _mark_processed(delta_path)
+        print(f"{dataset}: +{added} rows from {os.path.basename(delta_path)} ({total} quarterly rows)")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""成長指標の一括計算（セグメント × 四半期の行列に対するベクトル演算、Streamlit非依存）"""
+import numpy as np
+import pandas as pd
+
+import diagnostics
+
+
+class GrowthMetrics:
+    """期間ビュー内の全セグメントについて、成長指標をまとめて計算する
+
+    - index: 期間内で最初にデータがある四半期を1.00とした指数（基準値が0以下のセグメントはNaN）
+    - qoq:   前四半期比（%）。直前の四半期にデータがない・0の場合はNaN
+    - yoy:   前年同期比（%）。期間内に前年の同じ四半期がない・0の場合はNaN
+    - cagr:  最初と最後の四半期から求めた年平均成長率（%、セグメントごとのSeries）
+    """
+
+    def __init__(self, view, metric='営業収益'):
+        with diagnostics.span('metrics.growth'):
+            self._compute(view, metric)
+
+    def _compute(self, view, metric):
+        table = view.table(metric)
+        data = table.to_numpy()
+        n_segments, n_quarters = data.shape
+        rows = np.arange(n_segments)
+        present = ~np.isnan(data)
+        has_data = present.any(axis=1)
+        first = present.argmax(axis=1)
+        last = n_quarters - 1 - present[:, ::-1].argmax(axis=1)
+        base = data[rows, first]
+        end = data[rows, last]
+        # 四半期の通し番号（前年同期・経過年数の計算に使う）
+        ordinals = view.ordinals
+
+        # 前年同期の列位置（期間内にない場合は -1）
+        position = {o: i for i, o in enumerate(ordinals)}
+        prior_year = np.array([position.get(o - 4, -1) for o in ordinals], dtype=int)
+        nan_column = np.full((n_segments, 1), np.nan)
+        padded = np.hstack([data, nan_column])  # 列 -1 をNaNとして参照する
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid_base = has_data & (base > 0)
+            index = np.where(valid_base[:, None], data / base[:, None], np.nan)
+            previous = np.hstack([nan_column, data[:, :-1]])
+            qoq = np.where(previous != 0, (data / previous - 1) * 100, np.nan)
+            prior = padded[:, prior_year]
+            yoy = np.where(prior != 0, (data / prior - 1) * 100, np.nan)
+            years = (ordinals[last] - ordinals[first]) / 4
+            valid_cagr = valid_base & (end > 0) & (years > 0)
+            cagr = np.where(valid_cagr, ((end / base) ** (1 / years) - 1) * 100, np.nan)
+
+        def frame(values):
+            return pd.DataFrame(values, index=table.index, columns=table.columns)
+
+        self.index = frame(np.round(index, 2))
+        self.qoq = frame(np.round(qoq, 1))
+        self.yoy = frame(np.round(yoy, 1))
+        self.cagr = pd.Series(np.round(cagr, 1), index=table.index, name='CAGR')
+        self.valid_base = pd.Series(valid_base, index=table.index)
+
+    def base_index(self, segments):
+        """指定セグメントのうち基準値が正のものの成長指数（セグメント × 四半期）"""
+        segments = [s for s in segments if self.valid_base[s]]
+        return self.index.loc[segments]
+
+    def summary(self, segments):
+        """セグメント別の成長サマリー（CAGR・最終四半期の前年同期比・前四半期比）"""
+        return pd.DataFrame({
+            'CAGR（年率%）': self.cagr.loc[segments],
+            '前年同期比（%）': self.yoy.loc[segments].iloc[:, -1],
+            '前四半期比（%）': self.qoq.loc[segments].iloc[:, -1],
+        })
@@ -0,0 +1,31 @@
+"""セグメントの表示色（matplotlib・Vega-Lite の両方で使う、描画ライブラリ非依存）"""
+import colorsys
+
+# matplotlib の tab10 / tab20 と同じ色
+TAB10 = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+TAB20 = ['#1f77b4', '#aec7e8', '#ff7f0e', '#ffbb78', '#2ca02c', '#98df8a', '#d62728', '#ff9896', '#9467bd', '#c5b0d5',
+         '#8c564b', '#c49c94', '#e377c2', '#f7b6d2', '#7f7f7f', '#c7c7c7', '#bcbd22', '#dbdb8d', '#17becf', '#9edae5']
+
+# 固定したい色があればセグメント名で指定（未指定のセグメントは自動生成）
+SEGMENT_COLORS = {}
+
+
+def _hsv_hex(h, s, v):
+    return '#' + ''.join(f'{round(c * 255):02x}' for c in colorsys.hsv_to_rgb(h, s, v))
+
+
+def segment_palette(segments):
+    """セグメント一覧から色を自動生成（10件まで tab10、20件まで tab20、それ以上は色相を等分）"""
+    n = len(segments)
+    if n <= 10:
+        colors = TAB10
+    elif n <= 20:
+        colors = TAB20
+    else:
+        colors = [_hsv_hex(i / n, 0.65, 0.85) for i in range(n)]
+    return {s: SEGMENT_COLORS.get(s, colors[i]) for i, s in enumerate(segments)}
+
+
+def segment_color(palette, segment):
+    """セグメントの表示色"""
+    return palette.get(segment, '#333')
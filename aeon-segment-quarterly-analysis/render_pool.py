@@ -0,0 +1,89 @@
+"""チャート画像の並列描画（プロセスプール、Streamlit非依存）
+
+1回の再実行で表示するチャートは互いに独立しているため、まとめてワーカープロセスで描画し、
+要求した順に PNG を返す。matplotlib はプロセスごとに独立するので、グローバルな状態や
+GIL を共有せずに複数コアを使える。ワーカーは起動時に matplotlib・フォントの設定を済ませておく。
+
+Streamlit のサーバーはスレッドを使うため、fork ではなく forkserver でワーカーを起動する。
+forkserver はワーカー側の処理（render_worker）と charts（matplotlib）を読み込み済みのサーバープロセスから
+ワーカーを fork するので、ワーカーごとの起動が速い。アプリのスクリプトをワーカーで実行し直さないための
+準備も render_worker で行う。forkserver が使えない環境（Windows 等）では並列化しない。
+ワーカーが起動できなかった・異常終了した場合は、並列化せずにその場で描画する。
+
+並列化の効果はCPUコア数に依存する。2コア以下のホストでは、ワーカーとのデータの受け渡しの分だけ
+順番に描画するより遅くなることがある（benchmarks/bench_parallel_render.py で確認できる）。
+"""
+import multiprocessing
+import os
+import sys
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+import diagnostics
+import render_worker
+import reports
+
+
+def default_workers():
+    """既定のワーカー数（CPUコア数、最大4）"""
+    return min(4, os.cpu_count() or 1)
+
+
+def _mp_context():
+    """forkserver のコンテキスト（使えない環境では None）"""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    main_path = getattr(sys.modules['__main__'], '__file__', None)
+    if main_path:
+        # forkserver のサーバーは起動時の環境変数を受け継ぐ（render_worker を参照）
+        os.environ[render_worker.MAIN_PATH_ENV] = os.path.normpath(os.path.abspath(main_path))
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([render_worker.__name__, 'charts'])
+    return context
+
+
+class RenderPool:
+    """チャートの PNG をワーカープロセスで並列に描画する
+
+    複数のセッションから同時に使える（ProcessPoolExecutor はスレッドセーフ）。
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_workers()
+        context = _mp_context()
+        self._executor = None if context is None else ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=render_worker.init_worker,
+        )
+
+    def warm_up(self):
+        """全ワーカーを起動して matplotlib の読み込みを済ませる（初回の描画を待たせないため、起動できなければ False）"""
+        if self._executor is None:
+            return False
+        try:
+            # ワーカーは submit のたびに必要な数だけ起動される
+            futures = [self._executor.submit(render_worker.init_worker) for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+        except BrokenExecutor:
+            self.shutdown()
+            return False
+        return True
+
+    def render(self, view, requests):
+        """[(chart_id, segment)] の各チャートを並列に描画し、同じ順で PNG（データがなければ None）を返す"""
+        if len(requests) > 1 and self._executor is not None:
+            try:
+                with diagnostics.span('figure.parallel'):
+                    jobs = [(view, chart_id, segment) for chart_id, segment in requests]
+                    pngs = list(self._executor.map(render_worker.render, jobs))
+                diagnostics.count('figure.parallel', len(requests))
+                return pngs
+            except BrokenExecutor:
+                pass
+        # 1枚だけ、またはワーカーが使えなければその場で描画する
+        return [reports.build_chart_png(view, chart_id, segment) for chart_id, segment in requests]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
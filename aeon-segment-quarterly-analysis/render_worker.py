@@ -0,0 +1,35 @@
+"""チャート画像の並列描画のワーカー側の処理（render_pool が forkserver に事前に読み込ませる、Streamlit非依存）
+
+forkserver のワーカーは起動時に親プロセスの __main__ のスクリプトを実行し直す。Streamlit では
+これがアプリのスクリプト（app.py）になり、ワーカーでアプリが実行されてしまう。
+このモジュールを forkserver のサーバープロセスで読み込むときに、サーバーの __main__ を親と同じファイルとして
+登録しておき、そこから fork するワーカーでの再実行を省かせる（親のファイルは環境変数で受け取る）。
+ファイルを持つ __main__ から読み込まれた場合（Streamlit のプロセス・ベンチマーク等）は何もしない。
+"""
+import os
+import sys
+
+import reports
+
+# 親プロセスの __main__ のファイル（render_pool が forkserver を起動する前に設定する）
+MAIN_PATH_ENV = 'RENDER_POOL_MAIN_PATH'
+
+
+def _register_parent_main():
+    main = sys.modules['__main__']
+    path = os.environ.get(MAIN_PATH_ENV)
+    if path and getattr(main, '__file__', None) is None:
+        main.__file__ = path
+
+
+_register_parent_main()
+
+
+def init_worker():
+    """matplotlib・フォントの設定を済ませる"""
+    reports._charts()
+
+
+def render(job):
+    view, chart_id, segment = job
+    return reports.build_chart_png(view, chart_id, segment)
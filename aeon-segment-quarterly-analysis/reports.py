@@ -0,0 +1,233 @@
+"""HTMLレポート生成（ダウンロード要求時にのみ実行する）
+
+チャートの埋め込み形式は PNG（base64）と SVG（インライン）から選べる。
+gzip 圧縮した .html.gz も出力でき、総合レポートは全レポートを共通のCSSで1ファイルにまとめる。
+"""
+import base64
+import gzip
+import html
+import re
+
+import pandas as pd
+
+import analysis
+import diagnostics
+from palette import segment_palette
+
+
+def _charts():
+    """matplotlib を使うチャート描画モジュール
+
+    matplotlib の読み込みには時間がかかるため、画像を初めて描画するときに読み込む
+    （ブラウザ描画だけならプロセス内で一度も読み込まない）。フォント・テーマの設定もここで1回だけ行う。
+    """
+    import charts
+    charts.setup_matplotlib()
+    return charts
+
+
+# チャートの埋め込み形式
+REPORT_FORMATS = {
+    'png': "PNG（150dpi）",
+    'svg': "SVG（ベクター）",
+}
+
+REPORT_CSS = """
+    body { font-family: 'Hiragino Sans', 'Meiryo', sans-serif; padding: 20px; background: #f5f5f5; }
+    .container { max-width: 1200px; margin: 0 auto 30px; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+    .chart { text-align: center; margin: 20px 0; }
+    .chart img, .chart svg { max-width: 100%; height: auto; }
+    table { border-collapse: collapse; width: 100%; margin-top: 20px; background: white; }
+    th, td { border: 1px solid #ddd; padding: 10px; text-align: right; }
+    th { background: linear-gradient(135deg, #1f77b4, #ff7f0e); color: white; text-align: center; }
+    tr:nth-child(even) { background-color: #f9f9f9; }
+    tr:hover { background-color: #f0f0f0; }
+    h2 { color: #2C3E50; border-left: 5px solid #1f77b4; padding-left: 15px; margin-top: 0; }
+    nav ul { columns: 2; }
+    .timestamp { color: #888; font-size: 12px; text-align: right; margin-top: 20px; }
+"""
+
+
+def _chart_html(fig, fmt):
+    """チャートのHTML（PNGはbase64のimg、SVGはインライン）"""
+    if fig is None:
+        return ""
+    if fmt == 'svg':
+        svg = _charts().figure_to_bytes(fig, 'svg').decode('utf-8')
+        # XML宣言・DOCTYPE を除いて <svg> 要素だけを埋め込む
+        return f'<div class="chart">{svg[svg.index("<svg"):]}</div>'
+    img_base64 = base64.b64encode(_charts().figure_to_bytes(fig, 'png', dpi=150)).decode('utf-8')
+    return f'<div class="chart"><img src="data:image/png;base64,{img_base64}"/></div>'
+
+
+def _section_html(df, title, fig, fmt, anchor=None):
+    anchor_attr = f' id="{anchor}"' if anchor else ""
+    return f"""
+    <div class="container"{anchor_attr}>
+        <h2>📊 {html.escape(title)}</h2>
+        {_chart_html(fig, fmt)}
+        <h3>📋 詳細データ</h3>
+        {df.to_html(classes='data-table')}
+    </div>"""
+
+
+def _page_html(title, body):
+    return f"""
+    <html><head><meta charset='utf-8'><title>{html.escape(title)}</title>
+    <style>{REPORT_CSS}</style></head>
+    <body>
+    {body}
+    <p class="timestamp">生成日時: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+    </body></html>
+    """
+
+
+def get_html_report(df, title, fig=None, fmt='png'):
+    """HTMLダウンロード用データの生成（テーブル＋チャート）"""
+    with diagnostics.span('report.html'):
+        return _page_html(title, _section_html(df, title, fig, fmt))
+
+
+def compress_report(report_html):
+    """HTMLを gzip 圧縮（同じ内容なら同じバイト列になるよう mtime は固定）"""
+    with diagnostics.span('report.gzip'):
+        return gzip.compress(report_html.encode('utf-8'), compresslevel=9, mtime=0)
+
+
+# --- レポート定義（テーブル・チャートの生成処理、view は SegmentCube の期間ビュー） ---
+def _revenue_report(view, palette, segment):
+    table = view.table('営業収益', view.segments_present())
+    fig = _charts().stacked_bar_chart(table.T, palette, 'セグメント別営業収益の推移（積み上げ）', '営業収益（百万円）')
+    return table, fig
+
+
+def _profit_report(view, palette, segment):
+    table = view.table('営業利益', view.segments_present())
+    fig = _charts().stacked_bar_chart(table.T, palette, 'セグメント別営業利益の推移（積み上げ）', '営業利益（百万円）', zero_line=True)
+    return table, fig
+
+
+def _comp_rev_report(view, palette, segment):
+    segments = view.segments_present()
+    fig = _charts().composition_chart(view.frame('営業収益構成比', segments), palette, '営業収益構成比の推移')
+    return analysis.sort_by_last_quarter(view.table('営業収益構成比', segments)), fig
+
+
+def _comp_profit_report(view, palette, segment):
+    segments = view.segments_present()
+    fig = _charts().composition_chart(view.frame('営業利益構成比', segments), palette, '営業利益構成比の推移', zero_line=True)
+    return analysis.sort_by_last_quarter(view.table('営業利益構成比', segments)), fig
+
+
+def _margin_report(view, palette, segment):
+    segments = view.segments_present()
+    fig = _charts().margin_chart(view.frame('営業利益率', segments), palette)
+    return analysis.sort_by_last_quarter(view.table('営業利益率', segments)), fig
+
+
+def _growth_report(view, palette, segment):
+    growth = view.growth.base_index(analysis.growth_segments(view.segments_present()))
+    if growth.empty:
+        return None
+    return analysis.sort_by_last_quarter(growth), _charts().growth_chart(growth, palette, view.quarters[0])
+
+
+def _detail_report(view, palette, segment):
+    seg_detail = analysis.segment_detail(view, segment, view.growth)
+    if seg_detail.empty:
+        return None
+    return analysis.detail_table(seg_detail), _charts().segment_detail_chart(seg_detail, view.quarters[0])
+
+
+# report_id -> (タイトル, ファイル名, 生成関数)
+REPORTS = {
+    'revenue': ("セグメント別営業収益（{start_q}〜{end_q}）", "四半期_営業収益レポート.html", _revenue_report),
+    'profit': ("セグメント別営業利益（{start_q}〜{end_q}）", "四半期_営業利益レポート.html", _profit_report),
+    'comp_rev': ("営業収益構成比（{start_q}〜{end_q}）", "四半期_営業収益構成比レポート.html", _comp_rev_report),
+    'comp_profit': ("営業利益構成比（{start_q}〜{end_q}）", "四半期_営業利益構成比レポート.html", _comp_profit_report),
+    'margin': ("セグメント別営業利益率（{start_q}〜{end_q}）", "四半期_営業利益率レポート.html", _margin_report),
+    'growth': ("セグメント別営業収益成長率（{start_q}基準）", "四半期_成長率レポート.html", _growth_report),
+    'detail': ("{segment} - 四半期業績推移（{start_q}〜{end_q}）", "{segment}_四半期詳細レポート.html", _detail_report),
+}
+
+# セグメント選択に依存するレポート・チャート（それ以外はセグメントをキャッシュキーに含めない）
+SEGMENT_REPORTS = {'detail'}
+
+
+# 総合レポート（全レポートを1ファイルにまとめたもの）
+COMBINED_TITLE = "四半期別セグメント業績 総合レポート（{start_q}〜{end_q}）"
+COMBINED_FILE_NAME = "四半期_総合レポート.html"
+# ファイル名に使えない文字（Windows の予約文字・パス区切り・制御文字）
+UNSAFE_FILE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def safe_file_part(text, max_length=100):
+    """ファイル名の一部に使える文字列（パス区切り・OSで使えない文字・制御文字を _ に置き換える）"""
+    text = UNSAFE_FILE_CHARS.sub('_', str(text))[:max_length].rstrip(' .')
+    return text or '_'
+
+
+def report_file_name(report_id, segment=None, compress=False):
+    """レポートのダウンロードファイル名（report_id=None は総合レポート、セグメント名は safe_file_part で置き換える）"""
+    if report_id is None:
+        name = COMBINED_FILE_NAME
+    else:
+        name = REPORTS[report_id][1].format(segment=safe_file_part(segment))
+    return name + '.gz' if compress else name
+
+
+def report_mime(compress=False):
+    return "application/gzip" if compress else "text/html"
+
+
+def _build(view, report_id, segment):
+    # 色はデータセットの全セグメントから決める（期間を変えても同じ色）
+    _, _, builder = REPORTS[report_id]
+    with diagnostics.span('figure.build'):
+        return builder(view, segment_palette(view.segments), segment)
+
+
+def build_chart(view, chart_id, segment=None):
+    """レポートと同じチャートのみを生成（テーブルは捨てる）"""
+    result = _build(view, chart_id, segment)
+    return None if result is None else result[1]
+
+
+def build_chart_png(view, chart_id, segment=None):
+    """チャートをPNGで生成（データがなければ None）"""
+    fig = build_chart(view, chart_id, segment)
+    return None if fig is None else _charts().figure_to_bytes(fig)
+
+
+def _title(view, report_id, segment):
+    return REPORTS[report_id][0].format(start_q=view.quarters[0], end_q=view.quarters[-1], segment=segment)
+
+
+def build_report(view, report_id, segment=None, fmt='png'):
+    """レポート種別・期間（view）・セグメントを指定してHTMLレポートを生成"""
+    result = _build(view, report_id, segment)
+    if result is None:
+        return ""
+    table, fig = result
+    return get_html_report(table, _title(view, report_id, segment), fig, fmt)
+
+
+def build_combined_report(view, segments=(), fmt='png'):
+    """全レポートを1つのHTMLにまとめた総合レポート（CSSは共通、セグメント詳細は segments の分）"""
+    sections = []
+    for report_id in REPORTS:
+        targets = segments if report_id in SEGMENT_REPORTS else [None]
+        for segment in targets:
+            result = _build(view, report_id, segment)
+            if result is None:
+                continue
+            anchor = report_id if segment is None else f"{report_id}-{len(sections)}"
+            sections.append((anchor, _title(view, report_id, segment), result))
+    if not sections:
+        return ""
+
+    title = COMBINED_TITLE.format(start_q=view.quarters[0], end_q=view.quarters[-1])
+    toc = "".join(f'<li><a href="#{anchor}">{html.escape(t)}</a></li>' for anchor, t, _ in sections)
+    body = [f'<div class="container"><h2>📊 {html.escape(title)}</h2><nav><ul>{toc}</ul></nav></div>']
+    body += [_section_html(table, t, fig, fmt, anchor) for anchor, t, (table, fig) in sections]
+    return _page_html(title, "".join(body))
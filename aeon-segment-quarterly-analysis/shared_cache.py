@@ -0,0 +1,150 @@
+"""プロセス間で共有する計算結果のディスクキャッシュ（SQLite、Streamlit非依存）
+
+同じホストで動く複数のアプリプロセス（レプリカ）が、描画済みチャート・HTMLレポート・
+チャート仕様を共有し、再起動後もキャッシュが残るようにする。
+キーはチャート種別・期間・セグメント・データの内容ハッシュ（SegmentCube.version）などの組で、
+ここでさらに SHA-256 に変換して保存する。データが変われば内容ハッシュが変わるので、古い結果は
+参照されなくなり、サイズ上限を超えたときに最も古く参照されたものから削除される。
+
+インターフェースは figure_cache.FigureCache と同じ（get / put / get_or_render）。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import diagnostics
+
+DB_NAME = 'results.sqlite3'
+# 保存形式や描画処理を変えたら上げる（古いキャッシュを参照しないようにする）
+FORMAT_VERSION = '1'
+# 上限を超えたら、この割合まで減らす（削除のたびに書き込みが集中しないよう余裕を持たせる）
+LOW_WATERMARK = 0.9
+# 参照時刻はこの秒数より古いときだけ更新する（ヒットのたびに書き込みロックを取らないため）
+TOUCH_INTERVAL = 60.0
+
+
+def cache_key(key):
+    """キー（文字列・数値・None のタプル）を保存用のハッシュに変換"""
+    return hashlib.sha256(repr((FORMAT_VERSION, key)).encode('utf-8')).hexdigest()
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return 'bytes', value
+    if isinstance(value, str):
+        return 'str', value.encode('utf-8')
+    raise TypeError(f"キャッシュできない型です: {type(value).__name__}")
+
+
+def _decode(kind, blob):
+    return blob.decode('utf-8') if kind == 'str' else bytes(blob)
+
+
+class SharedCache:
+    """SQLite（WALモード）に bytes / str を保存するLRUキャッシュ
+
+    複数プロセス・複数スレッドから同時に使える（接続はスレッドごと、書き込みは
+    BEGIN IMMEDIATE で直列化）。キャッシュは補助的なものなので、ロック待ちの
+    タイムアウト等で読み書きできなかった場合はミスとして扱う。参照時刻（LRUの順序）は
+    TOUCH_INTERVAL 秒単位でしか更新しないので、削除の順序はその精度の近似になる。
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, timeout=10.0):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, DB_NAME)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY, kind TEXT NOT NULL, value BLOB NOT NULL,'
+            ' size INTEGER NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._connect().execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """キャッシュ済みの値（なければ None）"""
+        digest = cache_key(key)
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT kind, value, accessed FROM entries WHERE key = ?', (digest,)).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            diagnostics.count('shared_cache.miss')
+            return None
+        kind, blob, accessed = row
+        now = time.time()
+        if now - accessed > TOUCH_INTERVAL:
+            try:
+                conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, digest))
+            except sqlite3.Error:
+                # 参照時刻を更新できなくても取得した値は使う
+                pass
+        self.hits += 1
+        diagnostics.count('shared_cache.hit')
+        return _decode(kind, blob)
+
+    def put(self, key, value):
+        """値を保存し、合計サイズが上限を超えたら古い順に削除"""
+        kind, blob = _encode(value)
+        if len(blob) > self.max_bytes:
+            return
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, kind, value, size, accessed) VALUES (?, ?, ?, ?, ?)',
+                (cache_key(key), kind, blob, len(blob), time.time()),
+            )
+            self._evict(conn)
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - self.max_bytes * LOW_WATERMARK
+        freed, victims = 0, []
+        for digest, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            if freed >= target:
+                break
+            victims.append((digest,))
+            freed += size
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+
+    def get_or_render(self, key, render):
+        """キャッシュにあれば返し、なければ render() で計算して保存"""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        self._connect().execute('DELETE FROM entries')
+
+    @property
+    def size_bytes(self):
+        return self._connect().execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
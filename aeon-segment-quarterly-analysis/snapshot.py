@@ -0,0 +1,145 @@
+"""正規化済みデータの列指向スナップショット（Arrow IPC / Feather v2）
+
+CSVの読み込み・数値整形・ソートを済ませたデータを、CSVと同じフォルダに
+``segment_data.feather`` として保存し、起動時はメモリマップで読み込む。
+スナップショットにはCSVのサイズ・更新時刻・SHA-256を記録し、CSVが変わったら作り直す。
+
+    python snapshot.py                       # data/segment_data.csv のスナップショットを作成
+    python snapshot.py data/foo.csv --force  # 指定CSVを強制的に再作成
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.ipc
+
+import data_loader
+
+SNAPSHOT_SUFFIX = '.feather'
+# 正規化処理を変更したら上げる（古いスナップショットを無効化する）
+FORMAT_VERSION = '2'
+CATEGORY_COLUMNS = ['セグメント', '決算年度', '決算種別']
+
+
+def snapshot_path(csv_path):
+    """CSVに対応するスナップショットのパス"""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def file_digest(path):
+    """ファイル内容のSHA-256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encode_categories(df):
+    """文字列列をカテゴリ型に変換（メモリ削減・スナップショットと同じ型に揃える）"""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and df[col].dtype != 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _to_arrow(df):
+    """Arrow のテーブルに変換（浮動小数点列の NaN は null にせず値のまま保存する）
+
+    null を含まない列は、読み込み時にコピーせずメモリマップ上のバッファを pandas から参照できる。
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        if df[name].dtype.kind == 'f' and table.column(i).null_count:
+            table = table.set_column(i, table.field(i), pa.array(df[name].to_numpy(), from_pandas=False))
+    return table
+
+
+def _is_fresh(meta, csv_path):
+    if meta is None or meta.get(b'format_version') != FORMAT_VERSION.encode():
+        return False
+    stat = os.stat(csv_path)
+    if meta.get(b'source_size') != str(stat.st_size).encode():
+        return False
+    if meta.get(b'source_mtime_ns') == str(stat.st_mtime_ns).encode():
+        return True
+    # 更新時刻だけが変わった場合（git checkout 等）は内容ハッシュで判定
+    return meta.get(b'source_sha256') == file_digest(csv_path).encode()
+
+
+def read_snapshot(csv_path):
+    """有効なスナップショットがあればメモリマップで読み込む（なければ None）"""
+    path = snapshot_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        # 返したデータフレームの列がマップ上のバッファを参照するため、マップは明示的に閉じない
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        if not _is_fresh(reader.schema.metadata, csv_path):
+            return None
+        # 欠損のない数値列・カテゴリのコードはマップ上のバッファをそのまま参照する（コピーしない、読み取り専用）
+        return reader.read_all().to_pandas(split_blocks=True, self_destruct=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def write_snapshot(csv_path, df=None):
+    """正規化済みデータをスナップショットとして保存（一時ファイル経由で置き換え）"""
+    if df is None:
+        df = encode_categories(data_loader.load_segment_frame(csv_path))
+    stat = os.stat(csv_path)
+    table = _to_arrow(df)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'format_version': FORMAT_VERSION.encode(),
+        b'source_size': str(stat.st_size).encode(),
+        b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+        b'source_sha256': file_digest(csv_path).encode(),
+    })
+
+    path = snapshot_path(csv_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=SNAPSHOT_SUFFIX + '.tmp')
+    try:
+        # メモリマップで直接参照できるよう無圧縮で書き出す
+        with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def load_segment_frame(csv_path):
+    """スナップショットがあれば読み込み、なければCSVから作成して保存"""
+    df = read_snapshot(csv_path)
+    if df is not None:
+        return df
+    df = encode_categories(data_loader.load_segment_frame(csv_path))
+    try:
+        write_snapshot(csv_path, df)
+    except OSError:
+        # 読み取り専用の環境ではスナップショットなしで動作する
+        pass
+    return df
+
+
+def main():
+    default_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'segment_data.csv')
+    parser = argparse.ArgumentParser(description='正規化済みデータのスナップショットを作成')
+    parser.add_argument('csv', nargs='*', default=[default_csv], help='対象のCSV（既定: data/segment_data.csv）')
+    parser.add_argument('--force', action='store_true', help='有効なスナップショットがあっても作り直す')
+    args = parser.parse_args()
+
+    for csv_path in args.csv:
+        if not args.force and read_snapshot(csv_path) is not None:
+            print(f"up to date: {snapshot_path(csv_path)}")
+            continue
+        print(f"written: {write_snapshot(csv_path)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""ブラウザ側で描画するチャート（Vega-Lite 仕様のJSON、Streamlit非依存）
+
+charts.py（matplotlib）と同じチャートを Vega-Lite の仕様（dict）として組み立てる。
+サーバーではラスタライズを行わず、データと描画指定だけを送るので、
+ホバー表示やズームもブラウザ側で処理される。HTMLレポートは引き続き matplotlib を使う。
+"""
+import math
+
+import analysis
+from palette import segment_color, segment_palette
+
+SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+
+
+def _value(v):
+    """JSONに載せる値（NaN は null）"""
+    v = float(v)
+    return None if math.isnan(v) else v
+
+
+def _long_records(frame, value_field):
+    """セグメント × 四半期の表を縦持ちのレコードに変換"""
+    return [
+        {'セグメント': segment, '決算年度': quarter, value_field: _value(v)}
+        for segment, row in zip(frame.index, frame.to_numpy())
+        for quarter, v in zip(frame.columns, row)
+    ]
+
+
+def _color(palette, segments):
+    segments = list(segments)
+    return {
+        'field': 'セグメント', 'type': 'nominal', 'title': 'セグメント',
+        'scale': {'domain': segments, 'range': [segment_color(palette, s) for s in segments]},
+        'sort': segments,
+    }
+
+
+def _x(quarters):
+    return {'field': '決算年度', 'type': 'ordinal', 'title': '決算四半期', 'sort': list(quarters),
+            'axis': {'labelAngle': -45}}
+
+
+def _rule(y, dash=None):
+    mark = {'type': 'rule', 'color': 'black', 'strokeWidth': 0.5}
+    if dash:
+        mark['strokeDash'] = dash
+    return {'mark': mark, 'encoding': {'y': {'datum': y}}}
+
+
+def stacked_bar_spec(table, palette, title, ylabel, zero_line=False):
+    """セグメント別の積み上げ棒グラフ（table はセグメント × 四半期）"""
+    layers = [{
+        'mark': 'bar',
+        'encoding': {
+            'x': _x(table.columns),
+            'y': {'field': '値', 'type': 'quantitative', 'title': ylabel, 'stack': 'zero'},
+            'color': _color(palette, table.index),
+            'tooltip': [{'field': 'セグメント'}, {'field': '決算年度'},
+                        {'field': '値', 'type': 'quantitative', 'format': ',.0f'}],
+        },
+    }]
+    if zero_line:
+        layers.append(_rule(0))
+    return {
+        '$schema': SCHEMA, 'title': title, 'width': 'container', 'height': 360,
+        'data': {'values': _long_records(table, '値')},
+        'layer': layers,
+    }
+
+
+def line_spec(frame, palette, title, ylabel, rule=None, rule_dash=None, height=360, value_format='.1f'):
+    """セグメント別の折れ線（frame はセグメント × 四半期、NaN は途切れる）"""
+    layers = [{
+        'mark': {'type': 'line', 'point': True},
+        'encoding': {
+            'x': _x(frame.columns),
+            'y': {'field': '値', 'type': 'quantitative', 'title': ylabel},
+            'color': _color(palette, frame.index),
+            'tooltip': [{'field': 'セグメント'}, {'field': '決算年度'},
+                        {'field': '値', 'type': 'quantitative', 'format': value_format}],
+        },
+    }]
+    if rule is not None:
+        layers.append(_rule(rule, rule_dash))
+    return {
+        '$schema': SCHEMA, 'title': title, 'width': 'container', 'height': height,
+        'data': {'values': _long_records(frame, '値')},
+        'layer': layers,
+        'params': [{'name': 'zoom', 'select': 'interval', 'bind': 'scales'}],
+    }
+
+
+def segment_detail_spec(seg_detail, start_q, width=420, height=220):
+    """セグメント詳細の2x2グリッド"""
+    records = [
+        {'決算年度': q, '営業収益': _value(rev), '営業利益': _value(op),
+         '営業収益成長率': _value(g), '営業利益率': _value(m)}
+        for q, rev, op, g, m in zip(seg_detail['決算年度'], seg_detail['営業収益'], seg_detail['営業利益'],
+                                    seg_detail['営業収益成長率'], seg_detail['営業利益率'])
+    ]
+    x = {'field': '決算年度', 'type': 'ordinal', 'title': None, 'sort': list(seg_detail['決算年度']),
+         'axis': {'labelAngle': -90}}
+
+    def panel(title, layers):
+        return {'title': title, 'width': width, 'height': height, 'layer': layers}
+
+    def encoding(field, axis_title, fmt):
+        return {'x': x, 'y': {'field': field, 'type': 'quantitative', 'title': axis_title},
+                'tooltip': [{'field': '決算年度'}, {'field': field, 'type': 'quantitative', 'format': fmt}]}
+
+    revenue = panel('営業収益', [
+        {'mark': {'type': 'bar', 'color': 'skyblue'}, 'encoding': encoding('営業収益', '金額（百万円）', ',.0f')},
+    ])
+    profit_encoding = encoding('営業利益', '金額（百万円）', ',.0f')
+    profit_encoding['color'] = {'condition': {'test': 'datum.営業利益 >= 0', 'value': 'orange'}, 'value': 'red'}
+    profit = panel('営業利益', [{'mark': 'bar', 'encoding': profit_encoding}, _rule(0)])
+    growth = panel(f'営業収益成長率（{start_q}=1.00）', [
+        {'mark': {'type': 'line', 'point': True, 'color': 'green', 'strokeWidth': 2},
+         'encoding': encoding('営業収益成長率', '成長率（倍）', '.2f')},
+        _rule(1.0, [4, 4]),
+    ])
+    margin = panel('営業利益率', [
+        {'mark': {'type': 'line', 'point': True, 'color': 'purple', 'strokeWidth': 2},
+         'encoding': encoding('営業利益率', '利益率（%）', '.1f')},
+        _rule(0),
+    ])
+    return {
+        '$schema': SCHEMA,
+        'data': {'values': records},
+        'vconcat': [{'hconcat': [revenue, profit]}, {'hconcat': [growth, margin]}],
+    }
+
+
+# --- チャート定義（reports.REPORTS と同じ chart_id） ---
+def _revenue_spec(view, palette, segment):
+    table = view.table('営業収益', view.segments_present())
+    return stacked_bar_spec(table, palette, 'セグメント別営業収益の推移（積み上げ）', '営業収益（百万円）')
+
+
+def _profit_spec(view, palette, segment):
+    table = view.table('営業利益', view.segments_present())
+    return stacked_bar_spec(table, palette, 'セグメント別営業利益の推移（積み上げ）', '営業利益（百万円）', zero_line=True)
+
+
+def _comp_rev_spec(view, palette, segment):
+    frame = view.frame('営業収益構成比', view.segments_present())
+    return line_spec(frame, palette, '営業収益構成比の推移', '構成比（%）')
+
+
+def _comp_profit_spec(view, palette, segment):
+    frame = view.frame('営業利益構成比', view.segments_present())
+    return line_spec(frame, palette, '営業利益構成比の推移', '構成比（%）', rule=0)
+
+
+def _margin_spec(view, palette, segment):
+    frame = view.frame('営業利益率', view.segments_present())
+    return line_spec(frame, palette, 'セグメント別営業利益率の推移', '営業利益率（%）', rule=0, height=420)
+
+
+def _growth_spec(view, palette, segment):
+    growth = view.growth.base_index(analysis.growth_segments(view.segments_present()))
+    if growth.empty:
+        return None
+    start_q = view.quarters[0]
+    return line_spec(growth, palette, f'セグメント別営業収益成長率（{start_q}=1.00）', '成長率（倍）',
+                     rule=1.0, rule_dash=[4, 4], height=420, value_format='.2f')
+
+
+def _detail_spec(view, palette, segment):
+    seg_detail = analysis.segment_detail(view, segment, view.growth)
+    if seg_detail.empty:
+        return None
+    return segment_detail_spec(seg_detail, view.quarters[0])
+
+
+SPECS = {
+    'revenue': _revenue_spec,
+    'profit': _profit_spec,
+    'comp_rev': _comp_rev_spec,
+    'comp_profit': _comp_profit_spec,
+    'margin': _margin_spec,
+    'growth': _growth_spec,
+    'detail': _detail_spec,
+}
+
+
+def build_spec(view, chart_id, segment=None):
+    """チャートの Vega-Lite 仕様を生成（データがなければ None）"""
+    return SPECS[chart_id](view, segment_palette(view.segments), segment)